@@ -0,0 +1,599 @@
+"""Benchmarks for platformshconfig.
+
+Times Config construction and the hot accessors against synthetic Platform.sh environments, and records the peak
+memory allocated by a single call with tracemalloc. Results are written as JSON, and can be compared against a
+previously stored baseline:
+
+    python benchmarks/bench_config.py --profile realistic --output baseline.json
+    python benchmarks/bench_config.py --profile realistic --baseline baseline.json --threshold 0.25
+
+The second command exits with a non-zero status if any benchmark is slower than the baseline by more than the
+threshold.
+
+"""
+
+import os
+import sys
+import json
+import base64
+import atexit
+import shutil
+import argparse
+import platform
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from platformshconfig import Config  # noqa: E402
+from platformshconfig import clear_decode_cache  # noqa: E402
+from platformshconfig import DnsCache  # noqa: E402
+from platformshconfig import FileSource  # noqa: E402
+from platformshconfig import available_decoders  # noqa: E402
+from platformshconfig import get_decoder  # noqa: E402
+from platformshconfig import sqlalchemy_formatter  # noqa: E402
+
+
+"""
+Sizes of the synthetic environments. The key is the profile name, the value the number of routes, the number of
+relationships and the approximate size in bytes of the decoded PLATFORM_APPLICATION.
+"""
+PROFILES = {
+    "small": (10, 1, 10 * 1024),
+    "realistic": (100, 10, 100 * 1024),
+    "large": (1000, 100, 1024 * 1024),
+    "extreme": (10000, 500, 4 * 1024 * 1024),
+}
+
+"""
+Registered benchmarks, in run order. Each entry is a (name, setup) pair, where setup takes the generated environment
+and returns the callable to time.
+"""
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """Registers a benchmark setup function under the given name."""
+
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+
+    return register
+
+
+def encode(value):
+
+    return base64.b64encode(json.dumps(value).encode('utf-8'))
+
+
+def generate_routes(count):
+    """Generates a PLATFORM_ROUTES dict with the given number of routes."""
+
+    routes = {}
+    for i in range(count):
+        host = 'site{0}.master-7rqtwti-gcpjkefjk4wc2.us-2.platformsh.site'.format(i)
+        routes['https://{0}/'.format(host)] = {
+            'primary': i == 0,
+            'id': 'route{0}'.format(i),
+            'type': 'upstream',
+            'upstream': 'app{0}'.format(i % 5),
+            'original_url': 'https://site{0}.{{default}}/'.format(i),
+            'restrict_robots': False,
+            'attributes': {},
+            'cache': {
+                'enabled': True,
+                'headers': ['Accept', 'Accept-Language'],
+                'cookies': ['/^SS?ESS.*/'],
+                'default_ttl': 0,
+            },
+            'tls': {
+                'client_authentication': None,
+                'min_version': 771,
+                'client_certificate_authorities': [],
+                'strict_transport_security': {'include_subdomains': None, 'enabled': True, 'preload': None},
+            },
+            'ssi': {'enabled': False},
+            'http_access': {'addresses': [], 'basic_auth': {}},
+        }
+        routes['http://{0}/'.format(host)] = {
+            'primary': False,
+            'id': None,
+            'type': 'redirect',
+            'to': 'https://{0}/'.format(host),
+            'original_url': 'http://site{0}.{{default}}/'.format(i),
+            'restrict_robots': False,
+            'http_access': {'addresses': [], 'basic_auth': {}},
+        }
+    return routes
+
+
+def generate_relationships(count):
+    """Generates a PLATFORM_RELATIONSHIPS dict with the given number of relationships."""
+
+    relationships = {}
+    for i in range(count):
+        name = 'database' if i == 0 else 'service{0}'.format(i)
+        relationships[name] = [{
+            'scheme': 'mysql',
+            'cluster': 'dtsla3sy7euhc-master-7rqtwti',
+            'service': name,
+            'username': 'user',
+            'password': 'secret{0}'.format(i),
+            'host': '{0}.internal'.format(name),
+            'path': 'main',
+            'public': False,
+            'fragment': None,
+            'ip': '169.254.{0}.{1}'.format(i // 250, i % 250 + 1),
+            'query': {'is_master': True},
+            'rel': 'mysql',
+            'type': 'mysql:10.2',
+            'port': 3306,
+            'hostname': '{0}.mysql.service._.us-2.platformsh.site'.format(name),
+        }]
+    return relationships
+
+
+def location(i):
+    """Generates a web location for the synthetic application."""
+
+    return {
+        'root': 'static/{0}'.format(i),
+        'passthru': False,
+        'expires': '1d',
+        'rules': {r'\.(css|js)$': {'expires': '1w'}},
+    }
+
+
+def generate_application(size):
+    """Generates a PLATFORM_APPLICATION dict whose JSON encoding is roughly the given number of bytes."""
+
+    application = {
+        'name': 'app',
+        'type': 'python:3.7',
+        'disk': 128,
+        'size': 'AUTO',
+        'mounts': {},
+        'relationships': {'database': 'mysql:mysql'},
+        'web': {'locations': {'/': {'root': 'web', 'passthru': True, 'expires': '1h'}}},
+        'hooks': {'build': 'set -e\n', 'deploy': 'set -e\n', 'post_deploy': None},
+    }
+    locations = application['web']['locations']
+    count = max(0, size - len(json.dumps(application))) // len(json.dumps({'/static0': location(0)}))
+    for i in range(count):
+        locations['/static{0}'.format(i)] = location(i)
+    return application
+
+
+def generate_environment(routes, relationships, application_size):
+    """Generates a runtime Platform.sh environment of the given size.
+
+    Args:
+        routes (int):
+            The number of upstream routes. Each one also gets an http:// redirect route.
+        relationships (int):
+            The number of relationships.
+        application_size (int):
+            The approximate size in bytes of the decoded PLATFORM_APPLICATION.
+
+    Returns:
+        dict: The environment variables.
+
+    """
+
+    return {
+        'PLATFORM_APP_DIR': '/app',
+        'PLATFORM_APPLICATION_NAME': 'app',
+        'PLATFORM_PROJECT': 'test-project',
+        'PLATFORM_TREE_ID': 'abc123',
+        'PLATFORM_PROJECT_ENTROPY': 'def789',
+        'PLATFORM_BRANCH': 'master',
+        'PLATFORM_ENVIRONMENT': 'master-7rqtwti',
+        'PLATFORM_DOCUMENT_ROOT': '/app/web',
+        'PLATFORM_SMTP_HOST': '1.2.3.4',
+        'PORT': '8080',
+        'SOCKET': 'unix://tmp/blah.sock',
+        'PLATFORM_ROUTES': encode(generate_routes(routes)),
+        'PLATFORM_RELATIONSHIPS': encode(generate_relationships(relationships)),
+        'PLATFORM_VARIABLES': encode({'somevar': 'someval', 'env:FOO': 'bar'}),
+        'PLATFORM_APPLICATION': encode(generate_application(application_size)),
+    }
+
+
+@benchmark('init')
+def bench_init(env):
+
+    return lambda: Config(env)
+
+
+@benchmark('init_decode_all_cold')
+def bench_init_decode_all_cold(env):
+
+    def run():
+        clear_decode_cache()
+        config = Config(env)
+        config.routes()
+        config.credentials('database')
+        config.variables()
+        config.application()
+
+    return run
+
+
+@benchmark('snapshot_load_all_cold')
+def bench_snapshot_load_all_cold(env):
+
+    tmp_dir = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    path = os.path.join(tmp_dir, 'config.snapshot')
+    Config(env).save_snapshot(path)
+
+    def run():
+        clear_decode_cache()
+        config = Config.from_snapshot(path, env)
+        config.routes()
+        config.credentials('database')
+        config.variables()
+        config.application()
+
+    return run
+
+
+@benchmark('snapshot_mapped_cold')
+def bench_snapshot_mapped_cold(env):
+
+    tmp_dir = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    path = os.path.join(tmp_dir, 'config.snapshot')
+    Config(env).save_snapshot(path)
+
+    def run():
+        clear_decode_cache()
+        config = Config.from_snapshot(path, env, mapped=True)
+        config.credentials('database')
+        config.get_route('route0')
+        config.application()['web']
+
+    return run
+
+
+@benchmark('magic_property')
+def bench_magic_property(env):
+
+    config = Config(env)
+    return lambda: config.port
+
+
+@benchmark('get_many')
+def bench_get_many(env):
+
+    config = Config(env)
+    return lambda: config.get_many('port', 'applicationName', 'branch', 'environment')
+
+
+@benchmark('credentials')
+def bench_credentials(env):
+
+    config = Config(env)
+    return lambda: config.credentials('database')
+
+
+@benchmark('credentials_instrumented')
+def bench_credentials_instrumented(env):
+
+    config = Config(env).instrument()
+    return lambda: config.credentials('database')
+
+
+@benchmark('relationships_by_type')
+def bench_relationships_by_type(env):
+
+    config = Config(env)
+    return lambda: config.relationships_by_type('mysql')
+
+
+@benchmark('find_credentials_scheme')
+def bench_find_credentials_scheme(env):
+
+    config = Config(env)
+    return lambda: config.find_credentials(scheme='mysql')
+
+
+@benchmark('formatted_all')
+def bench_formatted_all(env):
+
+    config = Config(env)
+    config.formatted_all()
+    return config.formatted_all
+
+
+@benchmark('sqlalchemy_formatter')
+def bench_sqlalchemy_formatter(env):
+
+    credentials = Config(env).credentials('database')
+    return partial(sqlalchemy_formatter, credentials)
+
+
+@benchmark('magic_property_instrumented')
+def bench_magic_property_instrumented(env):
+
+    config = Config(env).instrument(lambda metric, value, labels: None)
+    return lambda: config.port
+
+
+@benchmark('formatted_credentials')
+def bench_formatted_credentials(env):
+
+    config = Config(env)
+    config.register_formatter('dsn', lambda credentials: 'mysql://{0}:{1}@{2}:{3}/{4}'.format(
+        credentials['username'], credentials['password'], credentials['host'], credentials['port'],
+        credentials['path']))
+    return lambda: config.formatted_credentials('database', 'dsn')
+
+
+def stub_resolve(host):
+    """A stand-in for the system resolver, with the latency of a local DNS round trip."""
+
+    time.sleep(0.0002)
+    return '10.0.0.1'
+
+
+@benchmark('addressed_credentials_resolved_cached')
+def bench_addressed_credentials_resolved_cached(env):
+
+    config = Config(env, addressing='resolved', dns_cache=DnsCache(ttl=60, resolve=stub_resolve))
+    return lambda: config.addressed_credentials('database')
+
+
+@benchmark('addressed_credentials_resolved_uncached')
+def bench_addressed_credentials_resolved_uncached(env):
+
+    config = Config(env, addressing='resolved', dns_cache=DnsCache(ttl=0, resolve=stub_resolve))
+    return lambda: config.addressed_credentials('database')
+
+
+@benchmark('get_route')
+def bench_get_route(env):
+
+    config = Config(env)
+    last = 'route{0}'.format(len(config.routes()) // 2 - 1)
+    return lambda: config.get_route(last)
+
+
+def routing_environment(env, count=10000):
+    """Returns a copy of env with count routes: 500 hosts of 19 path prefixes each, and wildcard hosts."""
+
+    routes = {}
+    hosts = count // 20
+    for i in range(hosts):
+        host = 'site{0}.example.com'.format(i)
+        routes['https://{0}/'.format(host)] = {'type': 'upstream', 'upstream': 'app', 'id': 'site{0}'.format(i)}
+        for j in range(18):
+            routes['https://{0}/section{1}/'.format(host, j)] = {'type': 'upstream', 'upstream': 'app'}
+        routes['http://{0}/'.format(host)] = {'type': 'redirect', 'to': 'https://{0}/'.format(host)}
+    for i in range(count - len(routes)):
+        routes['https://*.tenant{0}.example.com/'.format(i)] = {'type': 'upstream', 'upstream': 'tenants'}
+    return dict(env, PLATFORM_ROUTES=encode(routes))
+
+
+@benchmark('match_route_10k')
+def bench_match_route(env):
+
+    config = Config(routing_environment(env))
+    url = 'https://site250.example.com/section9/page?id=1'
+    config.match_route(url)
+    return partial(config.match_route, url)
+
+
+@benchmark('match_route_10k_uncached')
+def bench_match_route_uncached(env):
+
+    config = Config(routing_environment(env))
+    urls = ['https://site{0}.example.com/section{1}/page{2}'.format(i % 500, i % 18, i) for i in range(100000)]
+    iterator = iter(urls * 100)
+    return lambda: config.match_route(next(iterator))
+
+
+@benchmark('match_route_10k_wildcard')
+def bench_match_route_wildcard(env):
+
+    config = Config(routing_environment(env))
+    urls = ['https://customer{0}.tenant{1}.example.com/'.format(i, i % 250) for i in range(100000)]
+    iterator = iter(urls * 100)
+    return lambda: config.match_route(next(iterator))
+
+
+@benchmark('match_route_10k_build')
+def bench_match_route_build(env):
+
+    from platformshconfig.routing import RouteMatcher
+
+    routes = Config(routing_environment(env)).routes()
+    return partial(RouteMatcher, routes)
+
+
+@benchmark('variable')
+def bench_variable(env):
+
+    config = Config(env)
+    return lambda: config.variable('somevar')
+
+
+@benchmark('application_get')
+def bench_application_get(env):
+
+    config = Config(env)
+    return lambda: config.application_get('web.locations./.root')
+
+
+@benchmark('watch_poll_unchanged')
+def bench_watch_poll_unchanged(env):
+
+    tmp_dir = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    path = os.path.join(tmp_dir, 'env.json')
+    with open(path, 'w') as source:
+        json.dump({name: value.decode('ascii') if isinstance(value, bytes) else value
+                   for (name, value) in env.items()}, source)
+    source = FileSource(path)
+    watcher = Config.from_source(source).watch(lambda diff: None, source=source, interval=3600)
+    watcher.poll()
+    return watcher.poll
+
+
+@benchmark('reload_variables_changed')
+def bench_reload_variables_changed(env):
+
+    config = Config(env)
+    config.routes()
+    config.credentials('database')
+    environments = [
+        dict(env, PLATFORM_VARIABLES=encode({'somevar': 'someval', 'counter': i})) for i in range(2)
+    ]
+    state = {'i': 0}
+
+    def run():
+        state['i'] ^= 1
+        config.reload(environments[state['i']])
+
+    return run
+
+
+def bench_decode(variable, decoder):
+    """Returns a setup function that times decoding one environment variable with one JSON backend."""
+
+    def setup(env):
+        return partial(get_decoder(decoder).decode, env[variable])
+
+    return setup
+
+
+for decoder in available_decoders():
+    benchmark('decode_routes_{0}'.format(decoder))(bench_decode('PLATFORM_ROUTES', decoder))
+    benchmark('decode_application_{0}'.format(decoder))(bench_decode('PLATFORM_APPLICATION', decoder))
+
+
+def measure(func, min_time=0.2, repeat=5):
+    """Times a callable.
+
+    Returns:
+        dict: The best time per call in seconds, the number of calls per sample, and the peak memory allocated by a
+        single call in bytes.
+
+    """
+
+    func()
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    best = min([elapsed] + timer.repeat(repeat=repeat - 1, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds_per_op': best, 'number': number, 'peak_bytes': peak}
+
+
+def run(profile, only=None, min_time=0.2):
+    """Runs the benchmarks against an environment of the given profile.
+
+    Args:
+        profile (string):
+            A key of PROFILES.
+        only (list):
+            Names of the benchmarks to run. Defaults to all of them.
+        min_time (float):
+            Approximate number of seconds spent on each timing sample.
+
+    Returns:
+        dict: The JSON-serializable results.
+
+    """
+
+    env = generate_environment(*PROFILES[profile])
+    results = {}
+    for (name, setup) in BENCHMARKS:
+        if only and name not in only:
+            continue
+        clear_decode_cache()
+        results[name] = measure(setup(env), min_time=min_time)
+    return {
+        'profile': profile,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Compares results against a baseline.
+
+    Args:
+        current (dict):
+            Results returned by run().
+        baseline (dict):
+            Results returned by an earlier run().
+        threshold (float):
+            The allowed slowdown, as a fraction. 0.25 allows a benchmark to be 25% slower than its baseline.
+
+    Returns:
+        list: A (name, baseline seconds, current seconds) tuple for each regressed benchmark.
+
+    """
+
+    regressions = []
+    for (name, result) in current['results'].items():
+        if name not in baseline.get('results', {}):
+            continue
+        before = baseline['results'][name]['seconds_per_op']
+        after = result['seconds_per_op']
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Benchmark platformshconfig.')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='realistic')
+    parser.add_argument('--only', action='append', help='Run only this benchmark. May be repeated.')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds spent on each timing sample.')
+    parser.add_argument('--output', help='Write the results to this file instead of stdout.')
+    parser.add_argument('--baseline', help='Compare the results against this file.')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown against the baseline.')
+    args = parser.parse_args(argv)
+
+    results = run(args.profile, only=args.only, min_time=args.min_time)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold)
+        for (name, before, after) in regressions:
+            sys.stderr.write('{0}: {1:.3g}s -> {2:.3g}s per call\n'.format(name, before, after))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
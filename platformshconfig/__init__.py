@@ -1 +1,67 @@
-from .config import *
+import sys
+
+"""
+The submodule defining each public name. The key is the name, the value the submodule, which is only imported when one
+of its names is first accessed, so that importing the package stays cheap.
+"""
+_exports = {
+    "Config": "config",
+    "BuildTimeVariableAccessException": "config",
+    "NoCredentialFormatterFoundException": "config",
+    "NotValidPlatformException": "config",
+    "clear_decode_cache": "config",
+    "set_decode_cache_size": "config",
+    "Credentials": "views",
+    "Route": "views",
+    "Pool": "pool",
+    "PoolTimeoutException": "pool",
+    "Balancer": "balancer",
+    "Lease": "balancer",
+    "AsyncConfig": "aio",
+    "DnsCache": "resolver",
+    "ConfigSource": "source",
+    "EnvironmentSource": "source",
+    "FileSource": "source",
+    "SnapshotSource": "source",
+    "Watcher": "source",
+    "Decoder": "decoders",
+    "DecodingException": "decoders",
+    "available_decoders": "decoders",
+    "get_decoder": "decoders",
+    "amqp_formatter": "formatters",
+    "elasticsearch_formatter": "formatters",
+    "kafka_formatter": "formatters",
+    "memcached_formatter": "formatters",
+    "mysqlclient_formatter": "formatters",
+    "psycopg_formatter": "formatters",
+    "pymongo_formatter": "formatters",
+    "pysolr_formatter": "formatters",
+    "redis_formatter": "formatters",
+    "sqlalchemy_formatter": "formatters",
+}
+
+__all__ = list(_exports)
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        try:
+            module = _exports[name]
+        except KeyError:
+            raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+        value = getattr(__import__('{0}.{1}'.format(__name__, module), fromlist=[name]), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_exports))
+else:
+    # Module __getattr__ is not supported before Python 3.7.
+    from .config import *
+    from .views import *
+    from .pool import *
+    from .balancer import *
+    from .aio import *
+    from .resolver import *
+    from .source import *
+    from .decoders import *
+    from .formatters import *
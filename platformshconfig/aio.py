@@ -0,0 +1,183 @@
+import time
+import asyncio
+import inspect
+
+from .config import Config, NoCredentialFormatterFoundException
+
+__all__ = [
+    "AsyncConfig"
+]
+
+
+class AsyncConfig:
+    """Wraps a Config object for use with asyncio.
+
+    All the methods and magic properties of the wrapped Config object are available. In addition, credential
+    formatters may be coroutine functions, and warmup() connects to several relationships concurrently.
+
+    """
+
+    def __init__(self, config=None, **kwargs):
+        """Constructs an AsyncConfig object.
+
+        Args:
+            config (Config):
+                The Config object to wrap. Defaults to None, which creates one from the keyword arguments.
+            **kwargs:
+                The arguments of Config, if config is not given.
+
+        """
+
+        self._config = Config(**kwargs) if config is None else config
+        # Copy-on-write, like the registry of Config: (function, whether its results may be cached) by name.
+        self._asyncFormatters = {}
+        self._formattedCredentials = {}
+
+    def __getattr__(self, name):
+        # Private and special names are not forwarded. copy and pickle probe for them, possibly on an instance whose
+        # __init__ has not run, which has no _config to forward to.
+        if name.startswith('_'):
+            raise AttributeError("'{0}' object has no attribute '{1}'".format(type(self).__name__, name))
+        return getattr(self._config, name)
+
+    def register_formatter(self, name, formatter, cache=True):
+        """Adds a credential formatter, which may be a coroutine function.
+
+        Regular formatters are registered on the wrapped Config object. See Config.register_formatter().
+
+        Args:
+            name (string):
+                The name of the formatter.
+            formatter (callable):
+                A function, or a coroutine function, that formats relationship credentials.
+            cache (bool):
+                Whether the results of the formatter may be cached. Defaults to True.
+
+        Returns:
+            AsyncConfig. The called object, for chaining.
+
+        """
+
+        self._formattedCredentials = {
+            key: value for (key, value) in dict(self._formattedCredentials).items() if key[2] != name
+        }
+        formatters = dict(self._asyncFormatters)
+        if inspect.iscoroutinefunction(formatter):
+            formatters[name] = (formatter, cache)
+        else:
+            formatters.pop(name, None)
+            self._config.register_formatter(name, formatter, cache)
+        self._asyncFormatters = formatters
+        return self
+
+    async def formatted_credentials(self, relationship, formatter, index=0):
+        """Returns credentials for the specified relationship as formatted by the specified formatter.
+
+        Args:
+            relationship (string):
+                The relationship name as defined in .platform.app.yaml
+            formatter (string):
+                The name of a registered formatter.
+            index (int):
+                The index within the relationship to access. Defaults to 0.
+
+        Returns:
+            The credentials formatted with the given formatter.
+
+        Raises:
+            NoCredentialFormatterFoundException
+
+        """
+
+        try:
+            (func, cache) = self._asyncFormatters[formatter]
+        except KeyError:
+            if formatter not in self._config._credentialFormatters:
+                raise NoCredentialFormatterFoundException(
+                    'There is no credential formatter named {0} registered. '
+                    'Did you remember to call register_formatter()?'.format(formatter)
+                )
+            return self._config.formatted_credentials(relationship, formatter, index)
+
+        credentials = self._config.addressed_credentials(relationship, index)
+        if not cache:
+            return await func(credentials)
+
+        # The decoded credentials are only replaced when the configuration is reloaded with different values.
+        definition = self._config.credentials(relationship, index)
+        key = (relationship, index, formatter)
+        cached = self._formattedCredentials.get(key)
+        if (cached is not None and cached[0] is func and cached[1] is definition
+                and cached[2] == credentials.get('host')):
+            return cached[3]
+        result = await func(credentials)
+        self._formattedCredentials[key] = (func, definition, credentials.get('host'), result)
+        return result
+
+    async def _connect(self, relationship, factory, formatter, timeout):
+        """Builds a client for one relationship, and reports how long it took."""
+
+        start = time.monotonic()
+        report = {'client': None, 'error': None, 'elapsed': None}
+        try:
+            if formatter is None:
+                credentials = self._config.addressed_credentials(relationship)
+            else:
+                credentials = await self.formatted_credentials(relationship, formatter)
+            if inspect.iscoroutinefunction(factory):
+                client = factory(credentials)
+            else:
+                # A synchronous factory may block, so it runs in the default executor of the loop, which keeps
+                # the other relationships going and lets it time out.
+                loop = asyncio.get_event_loop()
+                client = await asyncio.wait_for(loop.run_in_executor(None, factory, credentials), timeout)
+            if inspect.isawaitable(client):
+                client = await asyncio.wait_for(client, max(0, start + timeout - time.monotonic()))
+            report['client'] = client
+        except asyncio.TimeoutError:
+            report['error'] = asyncio.TimeoutError(
+                'Connecting to {0} took longer than {1} seconds.'.format(relationship, timeout)
+            )
+        except Exception as error:
+            report['error'] = error
+        report['elapsed'] = time.monotonic() - start
+        return report
+
+    async def warmup(self, factory, relationships=None, formatter=None, timeout=10.0):
+        """Builds a client for each relationship, concurrently.
+
+        The factory is called with the credentials of each relationship, and may return an awaitable, for instance
+        when it is a coroutine function that opens a connection. Other factories are run in the default executor of
+        the event loop, so that blocking ones run concurrently too; when one times out, its thread is left to finish
+        and the client it builds is discarded. Errors do not stop the other relationships from being warmed up; they
+        are reported instead.
+
+        Args:
+            factory (callable):
+                Builds a client from the credentials of a relationship.
+            relationships (list):
+                The names of the relationships to warm up. Defaults to None, which warms up all of them.
+            formatter (string):
+                The name of a registered formatter to format the credentials with before passing them to the
+                factory. Defaults to None, which passes the credentials dict.
+            timeout (float):
+                The number of seconds each relationship may take. Defaults to 10.
+
+        Returns:
+            dict: A report for each relationship, with the 'client' built (or None), the 'error' raised (or None),
+            and the number of seconds it took as 'elapsed'.
+
+        Raises:
+            NotValidPlatformException:
+                If relationships is None and not running on Platform.sh.
+            BuildTimeVariableAccessException:
+                If relationships is None and called in the build phase.
+
+        """
+
+        if relationships is None:
+            relationships = list(self._config._relationships())
+        reports = await asyncio.gather(*[
+            self._connect(relationship, factory, formatter, timeout) for relationship in relationships
+        ])
+        return dict(zip(relationships, reports))
@@ -0,0 +1,298 @@
+import os
+import time
+import random
+import threading
+
+__all__ = [
+    "Balancer",
+    "Lease"
+]
+
+"""
+The endpoint selection strategies.
+"""
+STRATEGIES = ('round_robin', 'random', 'least_inflight', 'latency')
+
+"""
+The weight of the latest sample in the moving average of the latency of an endpoint.
+"""
+LATENCY_WEIGHT = 0.3
+
+
+class _EndpointState:
+    """What a balancer knows about one endpoint of a relationship."""
+
+    __slots__ = ('inflight', 'latency', 'failures', 'ejectedUntil', 'selected')
+
+    def __init__(self):
+        self.inflight = 0
+        self.latency = None
+        self.failures = 0
+        self.ejectedUntil = None
+        self.selected = 0
+
+
+class Balancer:
+    """Spreads the clients of a relationship over its endpoints.
+
+    A relationship lists one or more endpoints, for instance a primary database and its replicas. A balancer picks
+    one of them with a strategy:
+
+    - 'round_robin' takes each endpoint in turn.
+    - 'random' picks an endpoint at random.
+    - 'least_inflight' picks the endpoint with the fewest leases not reported yet.
+    - 'latency' picks the endpoint with the lowest moving average of the reported latencies. Endpoints without any
+      reported latency are picked first, so that each one gets measured.
+
+    Callers report the outcome of each lease. An endpoint that fails max_failures times in a row is ejected for
+    ejection_time seconds, and then gets a single chance before being ejected again. If every endpoint is ejected,
+    the one whose ejection ends first is picked anyway.
+
+    A balancer is thread-safe and fork-aware: in a process forked after it was used, it starts over.
+
+    """
+
+    def __init__(self, credentials, size, max_failures=3, ejection_time=30.0, clock=time.monotonic):
+        """Constructs a balancer.
+
+        Args:
+            credentials (callable):
+                Returns the (formatted) credentials of an endpoint, given its index.
+            size (int):
+                The number of endpoints.
+            max_failures (int):
+                The number of consecutive failures after which an endpoint is ejected. Defaults to 3.
+            ejection_time (float):
+                The number of seconds an endpoint stays ejected. Defaults to 30.
+            clock (callable):
+                Returns the current time in seconds. Defaults to time.monotonic.
+
+        """
+
+        if size < 1:
+            raise ValueError('A balancer needs at least one endpoint.')
+        if max_failures < 1:
+            raise ValueError('max_failures must be at least 1.')
+
+        self._credentials = credentials
+        self._size = size
+        self._maxFailures = max_failures
+        self._ejectionTime = ejection_time
+        self._clock = clock
+        self._reset()
+
+    def _reset(self):
+        """Starts over with no history, in the current process."""
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._states = [_EndpointState() for _ in range(self._size)]
+        self._next = 0
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _available(self, now):
+        """Returns the indexes of the endpoints that are not ejected.
+
+        Must be called with the lock held.
+
+        """
+
+        available = []
+        for (index, state) in enumerate(self._states):
+            if state.ejectedUntil is not None and state.ejectedUntil <= now:
+                # The ejection is over: one more failure ejects the endpoint again.
+                state.ejectedUntil = None
+                state.failures = self._maxFailures - 1
+            if state.ejectedUntil is None:
+                available.append(index)
+        if not available:
+            available.append(min(range(self._size), key=lambda index: self._states[index].ejectedUntil))
+        return available
+
+    def _pick(self, strategy, now):
+        """Picks the index of an endpoint. Must be called with the lock held."""
+
+        # Start from the round-robin position, which also breaks the ties of the other strategies.
+        start = self._next
+        candidates = sorted(self._available(now), key=lambda index: (index - start) % self._size)
+        if strategy == 'round_robin':
+            index = candidates[0]
+        elif strategy == 'random':
+            index = random.choice(candidates)
+        elif strategy == 'least_inflight':
+            index = min(candidates, key=lambda index: self._states[index].inflight)
+        elif strategy == 'latency':
+            unmeasured = [index for index in candidates if self._states[index].latency is None]
+            if unmeasured:
+                index = unmeasured[0]
+            else:
+                index = min(candidates, key=lambda index: self._states[index].latency)
+        else:
+            raise ValueError('Unknown strategy {0!r}. Use one of: {1}.'.format(strategy, ', '.join(STRATEGIES)))
+        self._next = (index + 1) % self._size
+        return index
+
+    def select(self, strategy='round_robin'):
+        """Picks an endpoint.
+
+        Args:
+            strategy (string):
+                'round_robin', 'random', 'least_inflight' or 'latency'. Defaults to 'round_robin'.
+
+        Returns:
+            Lease: The endpoint, whose outcome must be reported with success() or failure(), or by using the lease
+            as a context manager.
+
+        Raises:
+            ValueError:
+                If the strategy is unknown.
+            Same as the credentials callable.
+
+        """
+
+        self._check_fork()
+        with self._lock:
+            index = self._pick(strategy, self._clock())
+            state = self._states[index]
+            state.inflight += 1
+            state.selected += 1
+        try:
+            credentials = self._credentials(index)
+        except BaseException:
+            with self._lock:
+                state.inflight -= 1
+            raise
+        return Lease(self, index, credentials)
+
+    def report(self, index, success, latency=None):
+        """Records the outcome of a use of an endpoint.
+
+        This reports on an endpoint without a lease, for instance from a health check, and leaves the number of
+        leases in flight unchanged. Report on leases with Lease.success() and Lease.failure() instead.
+
+        Args:
+            index (int):
+                The index of the endpoint.
+            success (bool):
+                Whether the endpoint served the request.
+            latency (float):
+                How long the request took, in seconds. Defaults to None, which leaves the latency average
+                unchanged.
+
+        """
+
+        self._check_fork()
+        with self._lock:
+            self._record(self._states[index], success, latency)
+
+    def _record(self, state, success, latency):
+        """Records an outcome. Must be called with the lock held."""
+
+        if latency is not None:
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += LATENCY_WEIGHT * (latency - state.latency)
+        if success:
+            state.failures = 0
+            state.ejectedUntil = None
+        else:
+            state.failures += 1
+            if state.failures >= self._maxFailures:
+                state.ejectedUntil = self._clock() + self._ejectionTime
+
+    def _release(self, index, success, latency):
+        """Records the outcome of a lease."""
+
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            state = self._states[index]
+            state.inflight -= 1
+            self._record(state, success, latency)
+
+    def stats(self):
+        """Returns what the balancer knows about each endpoint.
+
+        Returns:
+            list: For each endpoint, by index, a dict with the number of leases 'inflight', the moving average
+            'latency' in seconds (None until one is reported), the number of consecutive 'failures', whether it is
+            'ejected', and how many times it was 'selected'.
+
+        """
+
+        self._check_fork()
+        now = self._clock()
+        with self._lock:
+            return [{
+                'inflight': state.inflight,
+                'latency': state.latency,
+                'failures': state.failures,
+                'ejected': state.ejectedUntil is not None and state.ejectedUntil > now,
+                'selected': state.selected,
+            } for state in self._states]
+
+
+class Lease:
+    """An endpoint picked by a balancer, until its outcome is reported.
+
+    Used as a context manager, a lease reports a success with the time spent in the block as the latency, or a
+    failure if the block raises an exception.
+
+    """
+
+    __slots__ = ('index', 'credentials', '_balancer', '_start', '_done')
+
+    def __init__(self, balancer, index, credentials):
+        """Constructs a lease. Use Balancer.select() instead.
+
+        Args:
+            balancer (Balancer):
+                The balancer that picked the endpoint.
+            index (int):
+                The index of the endpoint within the relationship.
+            credentials:
+                The (formatted) credentials of the endpoint.
+
+        """
+
+        self.index = index
+        self.credentials = credentials
+        self._balancer = balancer
+        self._start = time.monotonic()
+        self._done = False
+
+    def success(self, latency=None):
+        """Reports that the endpoint served the request. Only the first report of a lease is recorded.
+
+        Args:
+            latency (float):
+                How long the request took, in seconds. Defaults to None, which uses the time since the lease was
+                taken.
+
+        """
+
+        if not self._done:
+            self._done = True
+            self._balancer._release(self.index, True, time.monotonic() - self._start if latency is None else latency)
+
+    def failure(self):
+        """Reports that the endpoint failed. Only the first report of a lease is recorded."""
+
+        if not self._done:
+            self._done = True
+            self._balancer._release(self.index, False, None)
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.success()
+        else:
+            self.failure()
+        return False
@@ -0,0 +1,243 @@
+import re
+import sys
+import argparse
+
+from .config import Config
+
+__all__ = [
+    "LookupException",
+    "main",
+    "resolve"
+]
+
+"""
+Marks a missing value.
+"""
+_MISSING = object()
+
+"""
+A valid shell variable name.
+"""
+_NAME = re.compile('^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _walk(value, path, key):
+    """Follows a list of dict keys or list indexes into a value."""
+
+    for step in path:
+        try:
+            if isinstance(value, list):
+                value = value[int(step)]
+            else:
+                value = value[step]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise LookupException('{0}: no {1!r} in the value.'.format(key, step))
+    return value
+
+
+def resolve(config, key):
+    """Looks up a value by key.
+
+    The keys are:
+
+    - credentials.<relationship>[.<index>][.<field>...], for instance credentials.database.host
+    - formatted.<relationship>.<formatter>[.<index>], for instance formatted.mongodb.pymongo
+    - routes.<id>[.<field>...] or routes.primary[.<field>...], for instance routes.primary.url
+    - var.<name>, a Platform.sh variable, for instance var.env:FOO
+    - app.<path>, a value of the application definition, as read by Config.application_get()
+    - <property>, a magic property, for instance port or branch
+
+    Only the environment variables that hold the value are decoded.
+
+    Args:
+        config (Config):
+            The configuration to read.
+        key (string):
+            The key of the value.
+
+    Returns:
+        The value.
+
+    Raises:
+        LookupException:
+            If the key is invalid or does not match a value.
+
+    """
+
+    (kind, _, rest) = key.partition('.')
+    try:
+        if not rest:
+            return config.get_many(kind)[0]
+        if kind == 'var':
+            value = config.variable(rest, _MISSING)
+        elif kind == 'app':
+            value = config.application_get(rest, _MISSING)
+        elif kind == 'credentials':
+            path = rest.split('.')
+            index = int(path.pop(1)) if len(path) > 1 and path[1].isdigit() else 0
+            return _walk(config.credentials(path[0], index), path[1:], key)
+        elif kind == 'formatted':
+            path = rest.split('.')
+            if len(path) not in (2, 3):
+                raise LookupException('{0}: use formatted.<relationship>.<formatter>[.<index>].'.format(key))
+            return config.formatted_credentials(path[0], path[1], int(path[2]) if len(path) == 3 else 0)
+        elif kind == 'routes':
+            path = rest.split('.')
+            route = config.primary_route() if path[0] == 'primary' else config.get_route(path[0])
+            return _walk(route, path[1:], key)
+        else:
+            raise LookupException('{0}: unknown key. Keys start with credentials., formatted., routes., var. or '
+                                  'app., or are a property name.'.format(key))
+    except LookupException:
+        raise
+    except (KeyError, ValueError, AttributeError, RuntimeError) as error:
+        raise LookupException('{0}: {1}'.format(key, error.args[0] if error.args else error))
+
+    if value is _MISSING:
+        raise LookupException('{0}: not defined.'.format(key))
+    return value
+
+
+def _text(value):
+    """Formats a value for text output: strings as they are, other values as JSON."""
+
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    import json
+    return json.dumps(value, separators=(',', ':'), sort_keys=True)
+
+
+def _variable_name(key):
+    """Derives a shell variable name from a key, for instance CREDENTIALS_DATABASE_HOST."""
+
+    name = re.sub('[^A-Za-z0-9]+', '_', key).strip('_').upper()
+    return '_' + name if not name or name[0].isdigit() else name
+
+
+def _format(values, output_format):
+    """Formats (name, key, value) triples in the given output format."""
+
+    if output_format == 'json':
+        import json
+        return json.dumps({key: value for (_, key, value) in values}, sort_keys=True) + '\n'
+    if output_format == 'export':
+        from shlex import quote
+        return ''.join('export {0}={1}\n'.format(name, quote(_text(value))) for (name, _, value) in values)
+    if output_format == 'nul':
+        return ''.join(_text(value) + '\0' for (_, _, value) in values)
+    return ''.join(_text(value) + '\n' for (_, _, value) in values)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='platformshconfig',
+                                     description='Reads Platform.sh configuration from the environment.')
+    parser.add_argument('--prefix', default='PLATFORM_', help='The prefix of the environment variables.')
+    parser.add_argument('--snapshot', help='Load the decoded definitions from this snapshot file, if it matches '
+                                           'the environment.')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    get = commands.add_parser('get', help='Print the values of several keys at once.',
+                              description='Print the values of several keys at once. Strings are printed as they '
+                                          'are, other values as JSON.')
+    get.add_argument('keys', nargs='+', metavar='[NAME=]key',
+                     help='credentials.<relationship>[.<index>].<field>, formatted.<relationship>.<formatter>, '
+                          'routes.<id|primary>.<field>, var.<name>, app.<path> or a property name. NAME sets the '
+                          'shell variable name in export format.')
+    get.add_argument('--format', dest='output_format', choices=('lines', 'export', 'json', 'nul'),
+                     default='lines', help='One value per line (default), export NAME=value lines for eval, a JSON '
+                                           'object, or NUL-terminated values.')
+    get.add_argument('--allow-missing', action='store_true',
+                     help='Output missing values as empty (null in JSON) instead of failing.')
+
+    generate = commands.add_parser('generate', help='Write a Python module of precomputed settings.',
+                                   description='Write a Python module of precomputed settings, to import at runtime '
+                                               'instead of decoding the environment. The module recomputes its '
+                                               'settings with Config if the environment changed since.')
+    generate.add_argument('--out', required=True, help='The path of the module to write.')
+    generate.add_argument('--formatter', dest='formatters', action='append', default=[],
+                          metavar='RELATIONSHIP:FORMATTER', help='Include the credentials of a relationship formatted '
+                                                                 'by a formatter. May be repeated.')
+    generate.add_argument('--variable', dest='variables', action='append', metavar='NAME',
+                          help='Include this Platform.sh variable. May be repeated. Defaults to all of them.')
+    return parser
+
+
+def _generate(config, args, stdout, stderr):
+    from .codegen import generate
+
+    formatters = []
+    for pair in args.formatters:
+        (relationship, separator, formatter) = pair.partition(':')
+        if not separator or not relationship or not formatter:
+            stderr.write('platformshconfig: invalid --formatter {0!r}, use RELATIONSHIP:FORMATTER.\n'.format(pair))
+            return 2
+        formatters.append((relationship, formatter))
+
+    try:
+        generate(config, args.out, formatters, args.variables)
+    except (KeyError, ValueError, RuntimeError) as error:
+        stderr.write('platformshconfig: {0}\n'.format(error.args[0] if error.args else error))
+        return 1
+    return 0
+
+
+def _get(config, args, stdout, stderr):
+    values = []
+    failed = False
+    for argument in args.keys:
+        (name, separator, key) = argument.partition('=')
+        if not separator or not _NAME.match(name):
+            (name, key) = (_variable_name(argument), argument)
+        try:
+            value = resolve(config, key)
+        except LookupException as error:
+            if not args.allow_missing:
+                stderr.write('platformshconfig: {0}\n'.format(error))
+                failed = True
+                continue
+            value = None
+        values.append((name, key, value))
+    if failed:
+        return 1
+    stdout.write(_format(values, args.output_format))
+    return 0
+
+
+def main(argv=None, environment_variables=None, stdout=None, stderr=None):
+    """Runs the platformshconfig command.
+
+    Args:
+        argv (list):
+            The command line arguments. Defaults to None, which uses sys.argv.
+        environment_variables (dict):
+            The environment variables to read. Defaults to None, which uses the current environment.
+        stdout (file):
+            Where to write the output. Defaults to sys.stdout.
+        stderr (file):
+            Where to write errors. Defaults to sys.stderr.
+
+    Returns:
+        int: The exit status: 0 on success, 1 if a key could not be resolved or the settings could not be
+        generated, 2 on invalid arguments.
+
+    """
+
+    stdout = sys.stdout if stdout is None else stdout
+    stderr = sys.stderr if stderr is None else stderr
+    args = _parser().parse_args(argv)
+
+    if args.snapshot is None:
+        config = Config(environment_variables, args.prefix)
+    else:
+        config = Config.from_snapshot(args.snapshot, environment_variables, args.prefix)
+
+    if args.command == 'generate':
+        return _generate(config, args, stdout, stderr)
+    return _get(config, args, stdout, stderr)
+
+
+class LookupException(ValueError):
+    pass
@@ -0,0 +1,235 @@
+import os
+import hashlib
+
+from .config import Config, NotValidPlatformException, _thaw
+
+__all__ = [
+    "environment_digest",
+    "generate",
+    "refresh",
+    "settings"
+]
+
+"""
+The version of the generated module format.
+"""
+FORMAT_VERSION = 1
+
+"""
+The header of a generated module.
+"""
+_HEADER = '''"""Platform.sh settings, precomputed by `platformshconfig generate`. Do not edit.
+
+The constants below were computed from the environment variables of the build or deploy hook that generated this
+module. On import, the variables they were computed from are checked against DIGEST: if they changed, the constants
+are recomputed from a platformshconfig.Config object, and FRESH is False. The port and socket properties are always
+read from the environment on import, as they differ between the hooks and the web process.
+"""
+
+'''
+
+"""
+The footer of a generated module, which checks it against the environment.
+"""
+_FOOTER = '''
+from platformshconfig.codegen import refresh as _refresh  # noqa: E402
+
+_refresh(globals())
+'''
+
+
+"""
+The variables, minus prefix, that the constants of a generated module are computed from, besides the magic properties.
+"""
+_DEFINITION_VARIABLES = ('RELATIONSHIPS', 'ROUTES', 'VARIABLES')
+
+
+def environment_digest(environment_variables, env_prefix='PLATFORM_'):
+    """Returns a digest of the environment variables a generated module depends on.
+
+    Only the variables the constants are computed from count: the definitions and the prefixed magic properties,
+    which also decide the phase. Other variables, such as the unprefixed PORT and SOCKET, which are only set for the
+    web process, do not make the module stale.
+
+    Args:
+        environment_variables (dict):
+            The environment variables.
+        env_prefix (string):
+            The prefix for environment variables.
+
+    Returns:
+        string: The hex digest.
+
+    """
+
+    variables = list(Config._directVariables.values()) + list(Config._directVariablesRuntime.values())
+    names = [env_prefix + variable for variable in variables + list(_DEFINITION_VARIABLES)]
+    names = [name for name in names if name in environment_variables]
+    digest = hashlib.sha1()
+    for name in sorted(names):
+        value = environment_variables[name]
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        digest.update(name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(value)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _properties(config):
+    """Returns the magic properties that are available in the current phase."""
+
+    properties = {}
+    names = list(config._directVariables)
+    if config.in_runtime():
+        names.extend(config._directVariablesRuntime)
+        names.extend(config._unPrefixedVariablesRuntime)
+    for name in names:
+        properties[name] = config.get_many(name)[0]
+    return properties
+
+
+def settings(config, formatters=(), variables=None):
+    """Computes the constants of a generated module.
+
+    Args:
+        config (Config):
+            The configuration to read.
+        formatters (list):
+            (relationship, formatter name) pairs of formatted credentials to include. The pairs of relationships
+            that are not defined are left out.
+        variables (list):
+            The names of the Platform.sh variables to include. Defaults to None, which includes all of them.
+
+    Returns:
+        dict: The constants, keyed by name: the PROPERTIES, the RELATIONSHIPS definition, the first CREDENTIALS of
+        each relationship, the FORMATTED credentials keyed by relationship and formatter, the ROUTES URLs keyed by id,
+        the PRIMARY_ROUTE URL and the VARIABLES.
+
+        All of them are empty when not running on Platform.sh. Relationships, formatted credentials and routes are
+        only available at runtime.
+
+    Raises:
+        Same as formatted_credentials().
+
+    """
+
+    if not config.is_valid_platform():
+        return {'PROPERTIES': {}, 'RELATIONSHIPS': {}, 'CREDENTIALS': {}, 'FORMATTED': {}, 'ROUTES': {},
+                'PRIMARY_ROUTE': None, 'VARIABLES': {}}
+
+    relationships = _thaw(config._relationshipsDef)
+    formatted = {}
+    for (relationship, formatter) in formatters:
+        if relationship in relationships:
+            formatted.setdefault(relationship, {})[formatter] = config.formatted_credentials(relationship, formatter)
+
+    routes = {}
+    primary = None
+    if config.in_runtime():
+        for (url, route) in config.routes().items():
+            if route.get('id'):
+                routes[route['id']] = url
+            if route.get('primary'):
+                primary = url
+
+    all_variables = config.variables()
+    if variables is None:
+        variables = all_variables
+    selected = {name: _thaw(all_variables[name]) for name in variables if name in all_variables}
+
+    return {
+        'PROPERTIES': _properties(config),
+        'RELATIONSHIPS': relationships,
+        'CREDENTIALS': {name: endpoints[0] for (name, endpoints) in relationships.items() if endpoints},
+        'FORMATTED': formatted,
+        'ROUTES': routes,
+        'PRIMARY_ROUTE': primary,
+        'VARIABLES': selected,
+    }
+
+
+def generate(config, path, formatters=(), variables=None):
+    """Writes a Python module of precomputed settings.
+
+    Importing the module costs no decoding at all while the environment still matches the one it was generated
+    from. The module is written to a temporary file first and then moved into place.
+
+    Args:
+        config (Config):
+            The configuration to read.
+        path (string):
+            The path of the module to write.
+        formatters (list):
+            See settings().
+        variables (list):
+            See settings().
+
+    Raises:
+        NotValidPlatformException:
+            If not running on Platform.sh.
+        Same as settings().
+
+    """
+
+    from pprint import pformat
+
+    if not config.is_valid_platform():
+        raise NotValidPlatformException('You are not running on Platform.sh, so there are no settings to generate.')
+
+    constants = settings(config, formatters, variables)
+    lines = [
+        _HEADER,
+        'FORMAT_VERSION = {0!r}\n'.format(FORMAT_VERSION),
+        'PREFIX = {0!r}\n'.format(config._envPrefix),
+        'DIGEST = {0!r}\n'.format(environment_digest(config._environmentVariables, config._envPrefix)),
+        'OPTIONS = {0}\n'.format(pformat({
+            'formatters': [list(pair) for pair in formatters],
+            'variables': None if variables is None else list(variables),
+        }, width=120)),
+        'FRESH = True\n',
+        '\n',
+    ]
+    for (name, value) in constants.items():
+        lines.append('{0} = {1}\n'.format(name, pformat(value, width=120)))
+    lines.append(_FOOTER)
+
+    tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w', encoding='utf-8') as module:
+        module.write(''.join(lines))
+    os.replace(tmp_path, path)
+
+
+def refresh(namespace, environment_variables=None):
+    """Checks a generated module against the environment, and recomputes its constants if it is stale.
+
+    This is called by the generated module itself when it is imported.
+
+    Args:
+        namespace (dict):
+            The globals of the generated module.
+        environment_variables (dict):
+            The environment variables to check against. Defaults to None, which uses the current environment.
+
+    Returns:
+        bool: True if the module is fresh, False if its constants were recomputed.
+
+    """
+
+    environment_variables = os.environ if environment_variables is None else environment_variables
+    prefix = namespace['PREFIX']
+    if (namespace.get('FORMAT_VERSION') == FORMAT_VERSION
+            and environment_digest(environment_variables, prefix) == namespace['DIGEST']):
+        properties = namespace['PROPERTIES']
+        for (name, variable) in Config._unPrefixedVariablesRuntime.items():
+            if name in properties:
+                properties[name] = environment_variables.get(variable)
+        namespace['FRESH'] = True
+        return True
+
+    options = namespace['OPTIONS']
+    config = Config(environment_variables, prefix)
+    namespace.update(settings(config, [tuple(pair) for pair in options['formatters']], options['variables']))
+    namespace['FRESH'] = False
+    return False
@@ -0,0 +1,162 @@
+import sys
+import binascii
+
+__all__ = [
+    "Decoder",
+    "DecodingException",
+    "available_decoders",
+    "get_decoder"
+]
+
+
+class Decoder:
+    """Decodes base64-encoded JSON environment variables with a given JSON backend.
+
+    The base64 content is decoded straight to bytes, which are handed to the JSON backend without an intermediate
+    string. Whatever the backend, invalid content raises a DecodingException.
+
+    """
+
+    __slots__ = ('name', '_loads')
+
+    def __init__(self, name, loads):
+        """Constructs a decoder.
+
+        Args:
+            name (string):
+                The name of the JSON backend.
+            loads (callable):
+                Parses UTF-8 encoded JSON bytes.
+
+        """
+
+        self.name = name
+        self._loads = loads
+
+    def decode(self, variable):
+        """Decodes a Platform.sh environment variable.
+
+        Args:
+            variable (string|bytes):
+                Base64-encoded JSON (the content of an environment variable).
+
+        Returns:
+            A dict (if representing a JSON object), or a scalar type.
+
+        Raises:
+            DecodingException:
+                If the variable is not valid base64-encoded, UTF-8 encoded JSON.
+
+        """
+
+        try:
+            return self._loads(binascii.a2b_base64(variable))
+        except ValueError as error:
+            # binascii.Error, UnicodeDecodeError and the decoding errors of all the JSON backends are ValueErrors.
+            raise DecodingException('Error decoding an environment variable with the {0} JSON backend: {1}'.format(
+                self.name, error))
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.name)
+
+
+def _stdlib_loads():
+    import json
+    if sys.version_info < (3, 6):
+        return lambda data: json.loads(data.decode('utf-8'))
+    return json.loads
+
+
+def _orjson_loads():
+    import orjson
+    return orjson.loads
+
+
+def _simdjson_loads():
+    import simdjson
+    return simdjson.loads
+
+
+def _ujson_loads():
+    import ujson
+    return ujson.loads
+
+
+"""
+The supported JSON backends, in order of preference. The key is the name, the value a function that imports the
+backend and returns its loads function, or raises ImportError if it is not installed.
+"""
+_backends = (
+    ('orjson', _orjson_loads),
+    ('simdjson', _simdjson_loads),
+    ('ujson', _ujson_loads),
+    ('json', _stdlib_loads),
+)
+
+"""
+The decoders created so far, keyed by name. None is the fastest installed decoder.
+"""
+_decoders = {}
+
+
+def get_decoder(name=None):
+    """Returns a decoder using the given JSON backend.
+
+    Args:
+        name (string):
+            'orjson', 'simdjson', 'ujson' or 'json' (the standard library). Defaults to None, which selects the
+            first one installed, in that order.
+
+    Returns:
+        Decoder: The decoder.
+
+    Raises:
+        ValueError:
+            If the backend is unknown.
+        ImportError:
+            If the backend is not installed.
+
+    """
+
+    try:
+        return _decoders[name]
+    except KeyError:
+        pass
+
+    if name is None:
+        for (backend, loads) in _backends:
+            try:
+                decoder = Decoder(backend, loads())
+                break
+            except ImportError:
+                continue
+    else:
+        backends = dict(_backends)
+        if name not in backends:
+            raise ValueError('Unknown JSON decoder: {0}. Use one of {1}.'.format(
+                name, ', '.join(backend for (backend, _) in _backends)))
+        decoder = Decoder(name, backends[name]())
+
+    return _decoders.setdefault(name, decoder)
+
+
+def available_decoders():
+    """Lists the JSON backends that are installed.
+
+    Returns:
+        list: The names of the installed backends, in order of preference.
+
+    """
+
+    names = []
+    for (name, _) in _backends:
+        try:
+            get_decoder(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+class DecodingException(ValueError):
+    pass
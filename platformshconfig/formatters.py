@@ -0,0 +1,270 @@
+import re
+
+__all__ = [
+    "amqp_formatter",
+    "elasticsearch_formatter",
+    "kafka_formatter",
+    "memcached_formatter",
+    "mysqlclient_formatter",
+    "psycopg_formatter",
+    "pymongo_formatter",
+    "pysolr_formatter",
+    "redis_formatter",
+    "sqlalchemy_formatter"
+]
+
+"""
+The SQLAlchemy URL template for each relationship scheme. Other schemes are used as the SQLAlchemy dialect name.
+"""
+_SQLALCHEMY_TEMPLATES = {
+    'mysql': 'mysql://{username!u}:{password!u}@{host}:{port}/{path!u}',
+    'pgsql': 'postgresql://{username!u}:{password!u}@{host}:{port}/{path!u}',
+    'postgresql': 'postgresql://{username!u}:{password!u}@{host}:{port}/{path!u}',
+}
+_SQLALCHEMY_DEFAULT_TEMPLATE = '{scheme}://{username!u}:{password!u}@{host}:{port}/{path!u}'
+
+"""
+Compiled templates, keyed by template. Templates are only compiled once per process, on first use.
+"""
+_templates = {}
+
+"""
+Matches the values that URL quoting leaves unchanged, which most credentials are.
+"""
+_URL_SAFE = re.compile(r'[A-Za-z0-9_.~-]*\Z')
+
+
+def _url_quote(value):
+    """Quotes a value for the user info or path of a URL, where / and @ must be escaped as well."""
+
+    value = '' if value is None else str(value)
+    if _URL_SAFE.match(value):
+        return value
+    from urllib.parse import quote
+    return quote(value, safe='')
+
+
+def _conninfo_quote(value):
+    """Quotes a value of a libpq connection string, as described in the PostgreSQL documentation."""
+
+    value = '' if value is None else str(value)
+    if value and not any(char in value for char in " '\\\t\n\r"):
+        return value
+    return "'{0}'".format(value.replace('\\', '\\\\').replace("'", "\\'"))
+
+
+"""
+The quoting function of each template conversion: {field!u} is URL-quoted, and {field!c} is quoted for a libpq
+connection string. Fields without a conversion are inserted as str.format would.
+"""
+_CONVERSIONS = {
+    None: None,
+    'u': _url_quote,
+    'c': _conninfo_quote,
+}
+
+
+def _template(template):
+    """Returns the compiled version of a template, compiling it on first use.
+
+    A compiled template is a function taking the credentials and returning the formatted string. The template is
+    only parsed once, into a format string of positional fields and the credentials key and quoting of each field.
+    Rendering only looks up and quotes the values.
+
+    Args:
+        template (string):
+            A str.format() template, whose conversions select the quoting of each field.
+
+    Returns:
+        callable: The compiled template.
+
+    """
+
+    try:
+        return _templates[template]
+    except KeyError:
+        pass
+
+    from string import Formatter
+
+    literals = []
+    fields = []
+    for (literal, field, _, conversion) in Formatter().parse(template):
+        literals.append(literal.replace('{', '{{').replace('}', '}}'))
+        if field is not None:
+            literals.append('{}')
+            fields.append((field, _CONVERSIONS[conversion]))
+    render_format = ''.join(literals).format
+    fields = tuple(fields)
+
+    def render(credentials):
+        return render_format(*[credentials[field] if quote is None else quote(credentials[field])
+                               for (field, quote) in fields])
+
+    return _templates.setdefault(template, render)
+
+
+def pymongo_formatter(credentials):
+    """Returns a DSN for a pymongo-MongoDB connection.
+
+    Note that the username and password will still be needed separately in the constructor.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted pymongo DSN.
+
+    """
+    return _template('{host}:{port}/{path}')(credentials)
+
+
+def pysolr_formatter(credentials):
+    """
+    Returns formatted Solr credentials for a pysolr-Solr connection.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted pysolr credential.
+
+    """
+
+    return _template('http://{ip}:{port}/{path}')(credentials)
+
+
+def sqlalchemy_formatter(credentials):
+    """Returns a URL for a SQLAlchemy engine.
+
+    MySQL and MariaDB relationships use the default SQLAlchemy MySQL driver, mysqlclient, and PostgreSQL relationships
+    the default PostgreSQL driver, psycopg2. Append a driver name to the scheme of the URL to use another one.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted SQLAlchemy URL, with the user name, password and database name URL-quoted.
+
+    """
+
+    return _template(_SQLALCHEMY_TEMPLATES.get(credentials['scheme'], _SQLALCHEMY_DEFAULT_TEMPLATE))(credentials)
+
+
+def psycopg_formatter(credentials):
+    """Returns a libpq connection string for a psycopg-PostgreSQL connection.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted connection string, such as "host=postgresql.internal port=5432 dbname=main user=main
+        password=''", with each value quoted as needed.
+
+    """
+
+    return _template('host={host!c} port={port} dbname={path!c} user={username!c} password={password!c}')(credentials)
+
+
+def mysqlclient_formatter(credentials):
+    """Returns the keyword arguments of MySQLdb.connect() for a mysqlclient-MySQL connection.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (dict) The read-only host, port, user, passwd and db arguments.
+
+    """
+
+    from .config import _ReadOnlyDict
+
+    return _ReadOnlyDict(host=credentials['host'], port=credentials['port'], user=credentials['username'],
+                         passwd=credentials['password'] or '', db=credentials['path'])
+
+
+def redis_formatter(credentials):
+    """Returns a URL for a redis-py connection, as read by redis.Redis.from_url().
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted redis URL, with the password, if any, URL-quoted.
+
+    """
+
+    if credentials.get('password'):
+        return _template('redis://:{password!u}@{host}:{port}')(credentials)
+    return _template('redis://{host}:{port}')(credentials)
+
+
+def memcached_formatter(credentials):
+    """Returns the server address of a Memcached connection, as read by pymemcache and python-memcached.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) The formatted host:port address.
+
+    """
+
+    return _template('{host}:{port}')(credentials)
+
+
+def elasticsearch_formatter(credentials):
+    """Returns a host URL for an elasticsearch-py connection.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted URL, with the user name and password, if any, URL-quoted.
+
+    """
+
+    if credentials.get('username'):
+        return _template('{scheme}://{username!u}:{password!u}@{host}:{port}')(credentials)
+    return _template('{scheme}://{host}:{port}')(credentials)
+
+
+def amqp_formatter(credentials):
+    """Returns a URL for an AMQP connection to RabbitMQ, as read by pika, kombu and aio-pika.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) A formatted AMQP URL. The user name, password and virtual host are URL-quoted, and the default
+        virtual host, /, is used when the relationship has no path.
+
+    """
+
+    if credentials.get('path'):
+        return _template('amqp://{username!u}:{password!u}@{host}:{port}/{path!u}')(credentials)
+    return _template('amqp://{username!u}:{password!u}@{host}:{port}/%2F')(credentials)
+
+
+def kafka_formatter(credentials):
+    """Returns a bootstrap server address for a Kafka client, such as kafka-python or confluent-kafka.
+
+    Args:
+        credentials (dict):
+            The credentials dictionary from the relationships.
+
+    Returns:
+        (string) The formatted host:port address.
+
+    """
+
+    return _template('{host}:{port}')(credentials)
@@ -0,0 +1,151 @@
+import time
+
+from .config import _decode_cache, _digest
+
+__all__ = []
+
+"""
+The Config methods whose calls are counted. Magic properties are counted separately, per property.
+"""
+COUNTED_METHODS = ('credentials', 'formatted_credentials', 'get_route', 'variable')
+
+
+class Instrumentation:
+    """Collects statistics for one Config object, and reports them to an optional observer.
+
+    The instrumentation is installed by replacing the counted methods of the Config object with wrappers stored on
+    the instance, and removed by deleting them again, so a Config object that is not instrumented runs the plain
+    methods without any check. The counters are plain integers: under heavy concurrency a few increments may be
+    lost.
+
+    """
+
+    def __init__(self, config, observer=None):
+        """Constructs the instrumentation of a Config object.
+
+        Args:
+            config (Config):
+                The configuration to instrument.
+            observer (callable):
+                Called with a metric name, a value and a dict of labels for each event. Defaults to None.
+
+        """
+
+        self._config = config
+        self._observer = observer
+        self.calls = {name: 0 for name in COUNTED_METHODS}
+        self.properties = {}
+        self.decodes = {}
+
+    def _emit(self, metric, value, labels):
+        if self._observer is not None:
+            self._observer(metric, value, labels)
+
+    def _counted(self, name, method):
+        """Wraps a method so that its calls are counted."""
+
+        calls = self.calls
+        labels = {'method': name}
+
+        def counted(*args, **kwargs):
+            calls[name] += 1
+            if self._observer is not None:
+                self._observer('config_calls', 1, labels)
+            return method(*args, **kwargs)
+
+        return counted
+
+    def _counted_formatted_credentials(self, method):
+        """Wraps formatted_credentials() so that its calls, and its cache hits and misses, are reported."""
+
+        config = self._config
+        counted = self._counted('formatted_credentials', method)
+
+        def formatted_credentials(*args, **kwargs):
+            (hits, misses) = (config._formattedHits, config._formattedMisses)
+            result = counted(*args, **kwargs)
+            if config._formattedHits != hits:
+                self._emit('config_cache', 1, {'cache': 'formatted_credentials', 'result': 'hit'})
+            elif config._formattedMisses != misses:
+                self._emit('config_cache', 1, {'cache': 'formatted_credentials', 'result': 'miss'})
+            return result
+
+        return formatted_credentials
+
+    def _counted_property(self, name, resolver):
+        """Wraps a magic property resolver so that its calls are counted."""
+
+        properties = self.properties
+        properties.setdefault(name, 0)
+        labels = {'method': 'property', 'property': name}
+
+        def counted():
+            properties[name] += 1
+            if self._observer is not None:
+                self._observer('config_calls', 1, labels)
+            return resolver()
+
+        return counted
+
+    def _compile_properties(self):
+        """Compiles the magic property resolvers of the Config object, wrapped to count their calls."""
+
+        resolvers = type(self._config)._compile_properties(self._config)
+        resolvers = {name: self._counted_property(name, resolver) for (name, resolver) in resolvers.items()}
+        self._config._propertyResolvers = resolvers
+        return resolvers
+
+    def _decode(self, name, encoded):
+        """Decodes an environment variable for the Config object, recording how long it took."""
+
+        config = self._config
+        stats = self.decodes.setdefault(name, {'decodes': 0, 'hits': 0, 'seconds': 0.0, 'bytes': 0})
+        hit = (config._envPrefix, name, _digest(encoded)) in _decode_cache
+        start = time.perf_counter()
+        decoded = type(config)._decode(config, name, encoded)
+        elapsed = time.perf_counter() - start
+
+        stats['hits' if hit else 'decodes'] += 1
+        stats['seconds'] += elapsed
+        stats['bytes'] = len(encoded)
+        labels = {'blob': name}
+        self._emit('config_cache', 1, {'cache': 'decode', 'blob': name, 'result': 'hit' if hit else 'miss'})
+        self._emit('config_decode_seconds', elapsed, labels)
+        self._emit('config_decode_bytes', len(encoded), labels)
+        return decoded
+
+    def install(self):
+        """Replaces the counted methods of the Config object with their instrumented versions."""
+
+        config = self._config
+        for name in COUNTED_METHODS:
+            method = getattr(type(config), name).__get__(config)
+            if name == 'formatted_credentials':
+                setattr(config, name, self._counted_formatted_credentials(method))
+            else:
+                setattr(config, name, self._counted(name, method))
+        config._compile_properties = self._compile_properties
+        config._decode = self._decode
+        config._propertyResolvers = None
+
+    def uninstall(self):
+        """Restores the plain methods of the Config object."""
+
+        config = self._config
+        for name in COUNTED_METHODS + ('_compile_properties', '_decode'):
+            config.__dict__.pop(name, None)
+        config._propertyResolvers = None
+
+    def stats(self):
+        """Returns the collected statistics. See Config.stats()."""
+
+        decodes = {name: dict(stats) for (name, stats) in self.decodes.items()}
+        return {
+            'calls': dict(self.calls),
+            'properties': dict(self.properties),
+            'decodes': decodes,
+            'decode_cache': {
+                'hits': sum(stats['hits'] for stats in decodes.values()),
+                'misses': sum(stats['decodes'] for stats in decodes.values()),
+            },
+        }
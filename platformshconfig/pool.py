@@ -0,0 +1,237 @@
+import os
+import time
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+
+__all__ = [
+    "Pool",
+    "PoolTimeoutException"
+]
+
+
+def _close_client(client):
+    """Closes a client if it has a close() method."""
+
+    close = getattr(client, 'close', None)
+    if close is not None:
+        close()
+
+
+class Pool:
+    """A pool of clients connected to one relationship endpoint.
+
+    Clients are built on demand by a factory from the credentials of the relationship, up to max_size clients at a
+    time. Checked in clients are kept idle for reuse until they have been idle for longer than idle_timeout, except
+    for the min_idle most recently used ones.
+
+    A pool is fork-aware: when used in a process forked after clients were created, it forgets the clients it
+    inherited from the parent process, without closing them, and starts over.
+
+    """
+
+    def __init__(self, factory, credentials, max_size=10, min_idle=0, idle_timeout=300.0, close=_close_client):
+        """Constructs a pool.
+
+        Args:
+            factory (callable):
+                Builds a client from the credentials.
+            credentials (callable):
+                Returns the (formatted) credentials to pass to the factory.
+            max_size (int):
+                The maximum number of clients, checked in or out. Defaults to 10.
+            min_idle (int):
+                The number of idle clients kept regardless of idle_timeout, and created by prewarm(). Defaults to 0.
+            idle_timeout (float):
+                The number of seconds after which an idle client is closed. Defaults to 300.
+            close (callable):
+                Closes a client. Defaults to calling its close() method, if it has one.
+
+        """
+
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1.')
+        if not 0 <= min_idle <= max_size:
+            raise ValueError('min_idle must be between 0 and max_size.')
+
+        self._factory = factory
+        self._credentials = credentials
+        self._maxSize = max_size
+        self._minIdle = min_idle
+        self._idleTimeout = idle_timeout
+        self._close = close
+        self._reset()
+
+    def _reset(self):
+        """Starts over with no clients, in the current process."""
+
+        self._pid = os.getpid()
+        self._condition = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._size = 0
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _expire(self, now):
+        """Removes the clients that have been idle for too long, and returns them to be closed.
+
+        Must be called with the condition held.
+
+        """
+
+        expired = []
+        while len(self._idle) > self._minIdle and now - self._idle[0][1] > self._idleTimeout:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def checkout(self, timeout=None):
+        """Takes a client from the pool, building one if none is idle.
+
+        Args:
+            timeout (float):
+                The number of seconds to wait for a client if max_size clients are already checked out. Defaults to
+                None, which waits forever.
+
+        Returns:
+            A client, which must be given back with checkin().
+
+        Raises:
+            PoolTimeoutException:
+                If no client became available before the timeout.
+
+        """
+
+        self._check_fork()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            expired = self._expire(time.monotonic())
+            while not self._idle and self._size >= self._maxSize:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeoutException(
+                        'No client available after {0} seconds; all {1} are checked out.'.format(
+                            timeout, self._maxSize)
+                    )
+                self._condition.wait(remaining)
+            if self._idle:
+                client = self._idle.pop()[0]
+            else:
+                client = None
+                self._size += 1
+
+        for stale in expired:
+            self._close(stale)
+        if client is not None:
+            return client
+
+        try:
+            return self._factory(self._credentials())
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def checkin(self, client, discard=False):
+        """Gives a client back to the pool.
+
+        Args:
+            client:
+                A client obtained from checkout().
+            discard (bool):
+                Whether to close the client instead of keeping it for reuse, for instance because it is broken.
+                Defaults to False.
+
+        """
+
+        if self._pid != os.getpid():
+            # The client belongs to a pool that was reset after a fork.
+            return
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((client, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            self._close(client)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Checks a client out for the duration of a with block.
+
+        The client is discarded instead of reused if the block raises an exception.
+
+        Args:
+            timeout (float):
+                See checkout().
+
+        """
+
+        client = self.checkout(timeout)
+        try:
+            yield client
+        except BaseException:
+            self.checkin(client, discard=True)
+            raise
+        self.checkin(client)
+
+    def prewarm(self):
+        """Builds clients until min_idle of them are idle.
+
+        Returns:
+            Pool. The called object, for chaining.
+
+        """
+
+        self._check_fork()
+        clients = []
+        with self._condition:
+            missing = max(min(self._minIdle - len(self._idle), self._maxSize - self._size), 0)
+            self._size += missing
+        try:
+            for _ in range(missing):
+                clients.append(self._factory(self._credentials()))
+        finally:
+            with self._condition:
+                self._size -= missing - len(clients)
+                now = time.monotonic()
+                self._idle.extend((client, now) for client in clients)
+                self._condition.notify_all()
+        return self
+
+    def close(self):
+        """Closes the idle clients.
+
+        Clients that are checked out are not affected, and the pool can still be used afterwards.
+
+        """
+
+        self._check_fork()
+        with self._condition:
+            idle = [client for (client, _) in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for client in idle:
+            self._close(client)
+
+    def stats(self):
+        """Returns the number of clients in the pool.
+
+        Returns:
+            dict: The number of clients, as 'size', and how many of them are 'idle' and 'in_use'.
+
+        """
+
+        self._check_fork()
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle), 'in_use': self._size - len(self._idle)}
+
+
+class PoolTimeoutException(RuntimeError):
+    pass
@@ -0,0 +1,76 @@
+import time
+import socket
+
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = [
+    "probe_endpoints"
+]
+
+
+def _probe(host, port, deadline, interval, max_interval):
+    """Tries to open a TCP connection to an endpoint until it succeeds or the deadline passes.
+
+    Returns:
+        dict: The readiness report of the endpoint.
+
+    """
+
+    start = time.monotonic()
+    report = {'host': host, 'port': port, 'ready': False, 'attempts': 0, 'latency': None, 'elapsed': None,
+              'error': None}
+    while True:
+        now = time.monotonic()
+        report['attempts'] += 1
+        try:
+            with socket.create_connection((host, port), timeout=max(deadline - now, 0.001)):
+                pass
+            report['ready'] = True
+            report['latency'] = time.monotonic() - now
+            report['error'] = None
+            break
+        except OSError as error:
+            report['error'] = error
+        now = time.monotonic()
+        if now + interval >= deadline:
+            break
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+    report['elapsed'] = time.monotonic() - start
+    return report
+
+
+def probe_endpoints(endpoints, timeout=30.0, interval=0.05, max_interval=1.0, max_workers=32):
+    """Waits for several TCP endpoints to accept connections, concurrently.
+
+    Each endpoint is retried with exponential backoff until it accepts a connection or the timeout expires, so the
+    whole probe takes as long as the slowest endpoint. At most max_workers endpoints are probed at once: when there
+    are more, the others wait for a thread, and are tried at least once even if the timeout expired meanwhile.
+
+    Args:
+        endpoints (list):
+            The (host, port) pairs to probe.
+        timeout (float):
+            The number of seconds to wait for the endpoints. Defaults to 30.
+        interval (float):
+            The number of seconds to wait before the first retry. Defaults to 0.05.
+        max_interval (float):
+            The maximum number of seconds to wait between retries. Defaults to 1.
+        max_workers (int):
+            The maximum number of threads probing endpoints. Defaults to 32.
+
+    Returns:
+        list: A report for each endpoint, in order, with its 'host' and 'port', whether it is 'ready', the number
+        of connection 'attempts', the 'latency' of the successful connection, the 'elapsed' time until it was ready
+        or the probe gave up, and the last connection 'error'.
+
+    """
+
+    if not endpoints:
+        return []
+    deadline = time.monotonic() + timeout
+    with ThreadPoolExecutor(max_workers=min(len(endpoints), max_workers)) as executor:
+        futures = [
+            executor.submit(_probe, host, port, deadline, interval, max_interval) for (host, port) in endpoints
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,87 @@
+import time
+import socket
+import threading
+
+__all__ = [
+    "DnsCache"
+]
+
+
+class DnsCache:
+    """An in-process cache of host name resolutions.
+
+    Each host name is resolved at most once per ttl seconds, so creating new connections does not hit the system
+    resolver every time. Lookups of cached host names do not take a lock, and a host name being resolved only
+    blocks the other lookups of the same host name.
+
+    """
+
+    def __init__(self, ttl=60.0, resolve=socket.gethostbyname):
+        """Constructs a DNS cache.
+
+        Args:
+            ttl (float):
+                The number of seconds a resolution is reused for. Defaults to 60.
+            resolve (callable):
+                Resolves a host name to an IP address. Defaults to socket.gethostbyname.
+
+        """
+
+        self._ttl = ttl
+        self._resolve = resolve
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hostLocks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host):
+        """Resolves a host name, using the cached address while it is fresh.
+
+        Args:
+            host (string):
+                The host name to resolve.
+
+        Returns:
+            string: The IP address.
+
+        Raises:
+            OSError:
+                If the host name cannot be resolved.
+
+        """
+
+        entry = self._entries.get(host)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            self.hits += 1
+            return entry[0]
+
+        with self._lock:
+            host_lock = self._hostLocks.get(host)
+            if host_lock is None:
+                host_lock = self._hostLocks[host] = threading.Lock()
+
+        # Concurrent lookups of the same host name wait for the first one instead of resolving it again.
+        with host_lock:
+            entry = self._entries.get(host)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            address = self._resolve(host)
+            self._entries[host] = (address, time.monotonic() + self._ttl)
+            return address
+
+    def clear(self):
+        """Forgets all cached resolutions."""
+
+        with self._lock:
+            self._entries = {}
+            self._hostLocks = {}
+
+
+"""
+The DNS cache used by Config objects that are not given one.
+"""
+default_dns_cache = DnsCache()
@@ -0,0 +1,157 @@
+__all__ = []
+
+"""
+The default ports, which are left out of the host of an incoming URL.
+"""
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+class RouteMatcher:
+    """Maps incoming URLs to the routes that serve them.
+
+    The matcher is built once from the routes definition. Each (scheme, host) pair of a route URL gets a trie of the
+    path segments of its routes, in a host table for exact host names and in a wildcard table for *.example.com
+    hosts. The routes definition lists each expansion of the {default} and {all} placeholders as a separate URL, so
+    every expanded host is indexed.
+
+    An incoming URL is matched against the trie of its exact host first, then against the tries of the wildcard
+    hosts that cover it, from the most specific to the least specific, and gets the route of the longest matching
+    path prefix. The results are cached per host, in a least recently used cache of cache_size paths, and for up to
+    cache_size hosts.
+
+    """
+
+    def __init__(self, routes, cache_size=256):
+        """Builds a matcher.
+
+        Args:
+            routes (dict):
+                The routes definition, keyed by URL.
+            cache_size (int):
+                The number of paths whose match is cached per host, and the number of hosts cached. Defaults to 256.
+
+        """
+
+        self._hosts = {}
+        self._wildcards = {}
+        self._cacheSize = cache_size
+        self._cache = {}
+        for (url, route) in routes.items():
+            (scheme, host, path) = _split(url)
+            if host.startswith('*.'):
+                table = self._wildcards
+                host = host[2:]
+            else:
+                table = self._hosts
+            node = table.setdefault((scheme, host), [None, {}])
+            for segment in _segments(path):
+                node = node[1].setdefault(segment, [None, {}])
+            if node[0] is None:
+                node[0] = dict(route, url=url)
+
+    def _tries(self, scheme, host):
+        """Yields the tries that may match a host, from the most specific to the least specific."""
+
+        trie = self._hosts.get((scheme, host))
+        if trie is not None:
+            yield trie
+        if self._wildcards:
+            position = host.find('.')
+            while position != -1:
+                trie = self._wildcards.get((scheme, host[position + 1:]))
+                if trie is not None:
+                    yield trie
+                position = host.find('.', position + 1)
+
+    def _lookup(self, scheme, host, path):
+        """Matches a split URL without the cache."""
+
+        segments = _segments(path)
+        for trie in self._tries(scheme, host):
+            node = trie
+            route = node[0]
+            for segment in segments:
+                node = node[1].get(segment)
+                if node is None:
+                    break
+                if node[0] is not None:
+                    route = node[0]
+            if route is not None:
+                return route
+        return None
+
+    def match(self, url):
+        """Returns the route that serves a URL.
+
+        Args:
+            url (string):
+                The URL of an incoming request. Its query string and fragment are ignored.
+
+        Returns:
+            dict: The route definition, with the URL it was defined for added as a 'url' key, or None if no route
+            serves the URL.
+
+        """
+
+        (scheme, host, path) = _split(url)
+        key = (scheme, host)
+
+        # The cache is only ever changed with single dict operations, so concurrent lookups can at worst evict a
+        # few entries early.
+        paths = self._cache.pop(key, None)
+        if paths is None:
+            paths = {}
+        self._cache[key] = paths
+        if len(self._cache) > self._cacheSize:
+            _evict_oldest(self._cache)
+
+        try:
+            route = paths.pop(path)
+        except KeyError:
+            route = self._lookup(scheme, host, path)
+            if len(paths) >= self._cacheSize:
+                _evict_oldest(paths)
+        paths[path] = route
+        return route
+
+
+def _split(url):
+    """Splits a URL into its lowercase scheme, its lowercase host without default port, and its path."""
+
+    (scheme, separator, rest) = url.partition('://')
+    if not separator:
+        (scheme, rest) = ('', url)
+    else:
+        scheme = scheme.lower()
+    if '?' in rest:
+        rest = rest.partition('?')[0]
+    if '#' in rest:
+        rest = rest.partition('#')[0]
+    slash = rest.find('/')
+    if slash == -1:
+        (host, path) = (rest, '/')
+    else:
+        (host, path) = (rest[:slash], rest[slash:])
+    if '@' in host:
+        host = host.rpartition('@')[2]
+    host = host.lower()
+    if ':' in host:
+        (name, _, port) = host.rpartition(':')
+        if port == DEFAULT_PORTS.get(scheme):
+            host = name
+    return (scheme, host, path)
+
+
+def _segments(path):
+    """Returns the non-empty segments of a path."""
+
+    return [segment for segment in path.split('/') if segment]
+
+
+def _evict_oldest(cache):
+    """Removes the least recently used entry of a cache, tolerating concurrent changes."""
+
+    try:
+        del cache[next(iter(cache))]
+    except (KeyError, RuntimeError, StopIteration):
+        pass
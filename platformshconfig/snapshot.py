@@ -0,0 +1,301 @@
+import os
+import sys
+import mmap
+import struct
+import marshal
+
+from collections.abc import Mapping
+
+from .config import _cache_store, _digest, _freeze, _paused_gc, _thaw
+
+"""
+Identifies a snapshot file and the version of its format.
+"""
+MAGIC = b'PSHSNAP\x02'
+
+"""
+The header length prefix, following MAGIC.
+"""
+_HEADER_LENGTH = struct.Struct('<I')
+
+"""
+The decoded definitions held in a snapshot. The key is the environment variable they are read from, minus prefix,
+the value the Config property that decodes them.
+"""
+DEFINITIONS = {
+    'ROUTES': '_routesDef',
+    'RELATIONSHIPS': '_relationshipsDef',
+    'VARIABLES': '_variablesDef',
+    'APPLICATION': '_applicationDef',
+}
+
+"""
+The definitions that are only decoded at runtime.
+"""
+RUNTIME_DEFINITIONS = ('ROUTES', 'RELATIONSHIPS')
+
+
+"""
+The variables, minus prefix, that decide the phase, and so which definitions are available. A snapshot is only used
+while they match, along with the digests of the definitions.
+"""
+PHASE_VARIABLES = ('APPLICATION_NAME', 'ENVIRONMENT')
+
+
+def _direct_variables(config):
+    """Returns the plain environment variables recorded in a snapshot, keyed by their full name.
+
+    They are what SnapshotSource loads the magic properties from. Only the PHASE_VARIABLES among them are checked
+    when the snapshot is read, as the others, such as PORT and SOCKET, which are not set in the deploy hook, do not
+    change the decoded definitions.
+
+    """
+
+    names = ['APPLICATION_NAME', 'ENVIRONMENT', 'MODE']
+    names.extend(config._directVariables.values())
+    names.extend(config._directVariablesRuntime.values())
+    variables = {config._envPrefix + name: config[name] for name in names}
+    for name in config._unPrefixedVariablesRuntime.values():
+        variables[name] = config._environmentVariables.get(name)
+    return variables
+
+
+def _phase_variables(variables, env_prefix):
+    """Returns the variables that decide the phase, out of a dict of environment variables."""
+
+    return {name: variables.get(env_prefix + name) for name in PHASE_VARIABLES}
+
+
+def _digests(config):
+    """Returns the digests of the raw encoded definitions, or None for the ones that are not set."""
+
+    digests = {}
+    for name in DEFINITIONS:
+        encoded = config[name]
+        digests[name] = _digest(encoded) if encoded else None
+    return digests
+
+
+class MappedDict(Mapping):
+    """A read-only mapping over a definition stored in a memory-mapped snapshot.
+
+    Only the keys are held in memory until a value is accessed. Each value is decoded from the mapped file on first
+    access and kept for later ones, so processes forked after the snapshot was mapped share its pages, and only hold
+    a copy of the values they use.
+
+    """
+
+    __slots__ = ('_buffer', '_entries', '_decoded')
+
+    def __init__(self, buffer, entries):
+        """Constructs a mapped definition.
+
+        Args:
+            buffer (memoryview):
+                The body of the snapshot.
+            entries (dict):
+                The (offset, size) of the marshalled value of each key in the body.
+
+        """
+
+        self._buffer = buffer
+        self._entries = entries
+        self._decoded = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._decoded[key]
+        except KeyError:
+            pass
+        (offset, size) = self._entries[key]
+        # Threads racing to decode the same value all get the value stored first.
+        return self._decoded.setdefault(key, _freeze(marshal.loads(self._buffer[offset:offset + size])))
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '{0}({1} keys)'.format(type(self).__name__, len(self._entries))
+
+
+def write_snapshot(config, path):
+    """Writes the decoded definitions of a Config object to a snapshot file.
+
+    Each key of a definition is marshalled separately, so that it can be decoded on its own from a memory-mapped
+    snapshot. The file is written to a temporary file first and then moved into place, so readers never see a
+    partial snapshot.
+
+    Args:
+        config (Config):
+            The configuration to save.
+        path (string):
+            The path of the snapshot file.
+
+    """
+
+    definitions = {}
+    payload = []
+    offset = 0
+    for (name, attribute) in sorted(DEFINITIONS.items()):
+        definition = _thaw(getattr(config, attribute))
+        if isinstance(definition, Mapping):
+            entries = {}
+            for (key, value) in definition.items():
+                data = marshal.dumps(value)
+                entries[key] = (offset, len(data))
+                payload.append(data)
+                offset += len(data)
+            definitions[name] = ('dict', entries)
+        else:
+            data = marshal.dumps(definition)
+            definitions[name] = ('value', (offset, len(data)))
+            payload.append(data)
+            offset += len(data)
+
+    header = marshal.dumps({
+        'python': sys.implementation.cache_tag,
+        'prefix': config._envPrefix,
+        'digests': _digests(config),
+        'variables': _direct_variables(config),
+        'definitions': definitions,
+        'size': offset,
+    })
+
+    tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as snapshot:
+        snapshot.write(MAGIC)
+        snapshot.write(_HEADER_LENGTH.pack(len(header)))
+        snapshot.write(header)
+        for data in payload:
+            snapshot.write(data)
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path, mapped=False):
+    """Reads the header and body of a snapshot file, without decoding the definitions.
+
+    Args:
+        path (string):
+            The path of the snapshot file.
+        mapped (bool):
+            Whether to memory-map the snapshot instead of reading it. Defaults to False.
+
+    Returns:
+        tuple: The header dict and the body, as a memoryview, or None if the file is missing, invalid or was written
+        by another Python version.
+
+    """
+
+    try:
+        with open(path, 'rb') as snapshot:
+            if mapped:
+                content = memoryview(mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                content = memoryview(snapshot.read())
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if bytes(content[:len(MAGIC)]) != MAGIC:
+            return None
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        (length,) = _HEADER_LENGTH.unpack_from(content, len(MAGIC))
+        header = marshal.loads(content[start:start + length])
+        body = content[start + length:]
+        if header['python'] != sys.implementation.cache_tag or len(body) != header['size']:
+            return None
+    except (ValueError, EOFError, TypeError, KeyError, struct.error):
+        return None
+    return (header, body)
+
+
+def decode_snapshot(header, body, mapped=False, names=None):
+    """Decodes the definitions held in a snapshot.
+
+    Args:
+        header (dict):
+            The header returned by open_snapshot().
+        body (memoryview):
+            The body returned by open_snapshot().
+        mapped (bool):
+            Whether to expose dict definitions as MappedDict objects instead of decoding them. Defaults to False.
+        names (iterable):
+            The names of the definitions to decode. Defaults to None, which decodes all of them.
+
+    Returns:
+        dict: The decoded definitions, keyed by the environment variable they were read from, minus prefix.
+
+    Raises:
+        ValueError:
+            If the body is corrupt.
+
+    """
+
+    definitions = {}
+    try:
+        with _paused_gc(0 if mapped else len(body)):
+            for (name, (kind, entries)) in header['definitions'].items():
+                if names is not None and name not in names:
+                    continue
+                if kind == 'value':
+                    (offset, size) = entries
+                    definitions[name] = _freeze(marshal.loads(body[offset:offset + size]))
+                elif mapped:
+                    definitions[name] = MappedDict(body, entries)
+                else:
+                    definitions[name] = _freeze({
+                        key: marshal.loads(body[offset:offset + size]) for (key, (offset, size)) in entries.items()
+                    })
+    except (EOFError, TypeError, KeyError) as error:
+        raise ValueError('Corrupt snapshot: {0}'.format(error))
+    return definitions
+
+
+def read_snapshot(config, path, mapped=False):
+    """Loads the decoded definitions of a Config object from a snapshot file.
+
+    The snapshot is only used if it was written by the same Python version, for the same prefix, in the same phase
+    and from the same encoded definitions the Config object reads. Otherwise the Config object is left untouched and
+    decodes its environment variables as usual.
+
+    Args:
+        config (Config):
+            The configuration to load into.
+        path (string):
+            The path of the snapshot file.
+        mapped (bool):
+            Whether to memory-map the snapshot and expose the definitions as MappedDict objects, instead of
+            decoding them up front. Defaults to False.
+
+    Returns:
+        bool: True if the snapshot was loaded, False if it is missing, invalid or stale.
+
+    """
+
+    opened = open_snapshot(path, mapped)
+    if opened is None:
+        return False
+    (header, body) = opened
+    try:
+        if (header['prefix'] != config._envPrefix
+                or header['digests'] != _digests(config)
+                or (_phase_variables(header['variables'], config._envPrefix)
+                    != _phase_variables(config._environmentVariables, config._envPrefix))):
+            return False
+        definitions = decode_snapshot(header, body, mapped)
+    except (ValueError, KeyError):
+        return False
+
+    for (name, definition) in definitions.items():
+        config._decodedDefs[name] = definition
+        if mapped or (name in RUNTIME_DEFINITIONS and not config.in_runtime()):
+            continue
+        if header['digests'][name] is not None and definition is not None:
+            _cache_store((config._envPrefix, name, header['digests'][name]), definition)
+    return True
@@ -0,0 +1,348 @@
+import os
+import json
+import base64
+import threading
+
+from collections.abc import Mapping
+
+__all__ = [
+    "ConfigSource",
+    "EnvironmentSource",
+    "FileSource",
+    "SnapshotSource",
+    "Watcher"
+]
+
+
+class ConfigSource:
+    """A source of environment variables that a Config object can be loaded from and watched.
+
+    A source provides a cheap fingerprint, compared between polls to detect changes, and loads the environment
+    variables, along with any definitions it already holds decoded.
+
+    """
+
+    def fingerprint(self):
+        """Returns a value that changes whenever the content of the source may have changed.
+
+        Returns:
+            A value comparable with ==.
+
+        """
+
+        raise NotImplementedError()
+
+    def load(self, env_prefix):
+        """Loads the content of the source.
+
+        Args:
+            env_prefix (string):
+                The prefix for environment variables of the Config object loading the source.
+
+        Returns:
+            tuple: The environment variables dict, and a dict of already decoded definitions keyed by the environment
+            variable they replace, minus prefix.
+
+        Raises:
+            OSError:
+                If the source cannot be read.
+            ValueError:
+                If the source is invalid.
+
+        """
+
+        raise NotImplementedError()
+
+
+class EnvironmentSource(ConfigSource):
+    """A mapping of environment variables, such as os.environ, that may be modified in place."""
+
+    def __init__(self, environment=None):
+        """Constructs an environment source.
+
+        Args:
+            environment (dict):
+                The environment variables. Defaults to None, which uses the current environment.
+
+        """
+
+        self._environment = os.environ if environment is None else environment
+
+    def fingerprint(self):
+        return tuple(sorted(self._environment.items()))
+
+    def load(self, env_prefix):
+        return (dict(self._environment), {})
+
+
+class FileSource(ConfigSource):
+    """A file of environment variables, either a JSON object or a dotenv file.
+
+    In a JSON file, the values of the encoded variables, such as PLATFORM_RELATIONSHIPS, may be given either encoded
+    or as plain JSON objects.
+
+    """
+
+    """
+    The supported file formats.
+    """
+    _formats = ('json', 'dotenv')
+
+    def __init__(self, path, format=None):
+        """Constructs a file source.
+
+        Args:
+            path (string):
+                The path of the file.
+            format (string):
+                'json' or 'dotenv'. Defaults to None, which is 'json' for files with a .json extension and 'dotenv'
+                otherwise.
+
+        """
+
+        if format is None:
+            format = 'json' if path.endswith('.json') else 'dotenv'
+        if format not in self._formats:
+            raise ValueError('Unknown file format: {0}. Use one of {1}.'.format(format, ', '.join(self._formats)))
+        self._path = path
+        self._format = format
+
+    def fingerprint(self):
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self, env_prefix):
+        with open(self._path, encoding='utf-8') as source:
+            content = source.read()
+        if self._format == 'json':
+            return (_parse_json(content), {})
+        return (_parse_dotenv(content), {})
+
+
+class SnapshotSource(ConfigSource):
+    """A snapshot file written by Config.save_snapshot().
+
+    The environment variables are the ones the snapshot was written from, and the definitions are loaded from the
+    snapshot instead of being decoded. Only the definitions whose digest changed since the previous load are read
+    again.
+
+    """
+
+    def __init__(self, path):
+        """Constructs a snapshot source.
+
+        Args:
+            path (string):
+                The path of the snapshot file.
+
+        """
+
+        self._path = path
+        self._digests = {}
+        self._definitions = {}
+
+    def fingerprint(self):
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self, env_prefix):
+        from .snapshot import decode_snapshot, open_snapshot
+
+        opened = open_snapshot(self._path)
+        if opened is None:
+            raise ValueError('Missing or invalid snapshot: {0}'.format(self._path))
+        (header, body) = opened
+        if header['prefix'] != env_prefix:
+            raise ValueError('The snapshot {0} was written for the prefix {1}, not {2}.'.format(
+                self._path, header['prefix'], env_prefix))
+
+        digests = header['digests']
+        changed = [name for name in header['definitions']
+                   if name not in self._definitions or self._digests.get(name) != digests.get(name)]
+        definitions = dict(self._definitions)
+        definitions.update(decode_snapshot(header, body, names=changed))
+        self._digests = digests
+        self._definitions = definitions
+
+        environment = {name: value for (name, value) in header['variables'].items() if value is not None}
+        return (environment, dict(definitions))
+
+
+class Watcher:
+    """Polls a source and reloads a Config object from it when it changes.
+
+    Use Config.watch() to create one.
+
+    """
+
+    """
+    The error raised by the last background poll, or None if it succeeded.
+    """
+    error = None
+
+    def __init__(self, config, source, callback, interval=1.0, fingerprint=None):
+        """Constructs a watcher.
+
+        Args:
+            config (Config):
+                The configuration to reload.
+            source (ConfigSource):
+                The source to poll.
+            callback (callable):
+                Called with the diff returned by poll(), when it is not empty.
+            interval (float):
+                The number of seconds between polls in the background. Defaults to 1.
+            fingerprint:
+                The fingerprint of the source the configuration is currently loaded from. Defaults to None, which
+                makes the first poll load the source.
+
+        """
+
+        self._config = config
+        self._source = source
+        self._callback = callback
+        self._interval = interval
+        self._fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Reloads the configuration if the source changed since the last poll.
+
+        Unless the watcher was given the current fingerprint of the source, the first poll always loads it. The
+        callback is called with the diff if it is not empty.
+
+        Returns:
+            dict: The diff of the definitions, as returned by Config.reload(), or None if the source did not change.
+
+        Raises:
+            OSError:
+                If the source cannot be read.
+            ValueError:
+                If the source is invalid.
+
+        """
+
+        with self._lock:
+            fingerprint = self._source.fingerprint()
+            if self._fingerprint is not None and fingerprint == self._fingerprint:
+                return None
+            (environment, definitions) = self._source.load(self._config._envPrefix)
+            diff = self._config.reload(environment, definitions)
+            self._fingerprint = fingerprint
+        if diff:
+            self._callback(diff)
+        return diff
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            try:
+                self.poll()
+                self.error = None
+            except Exception as error:
+                # The source may be in the middle of being rewritten: keep the current configuration and retry.
+                self.error = error
+
+    def start(self):
+        """Starts polling in a background daemon thread.
+
+        Returns:
+            Watcher. The called object, for chaining.
+
+        """
+
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='platformshconfig-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops polling in the background, and waits for the current poll to finish."""
+
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _parse_json(content):
+    """Parses a JSON object of environment variables, encoding the values that are not strings."""
+
+    variables = json.loads(content)
+    if not isinstance(variables, dict):
+        raise ValueError('A JSON configuration file must hold an object.')
+    environment = {}
+    for (name, value) in variables.items():
+        if isinstance(value, (dict, list)):
+            value = base64.b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+        elif value is not None and not isinstance(value, str):
+            value = str(value)
+        environment[name] = value
+    return environment
+
+
+def _parse_dotenv(content):
+    """Parses a dotenv file: NAME=value lines, with optional quotes, 'export ' prefixes and # comments."""
+
+    environment = {}
+    for (number, line) in enumerate(content.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):].lstrip()
+        (name, separator, value) = line.partition('=')
+        name = name.strip()
+        if not separator or not name:
+            raise ValueError('Invalid dotenv line {0}: {1}'.format(number, line))
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+            value = value[1:-1]
+        else:
+            value = value.split(' #', 1)[0].rstrip()
+        environment[name] = value
+    return environment
+
+
+def _diff_definition(before, after):
+    """Compares the top-level keys of two definitions.
+
+    Returns:
+        dict: The sorted 'added', 'removed' and 'changed' keys, or an empty dict if the definitions are equal.
+
+    """
+
+    if before is after:
+        return {}
+    before = before if isinstance(before, Mapping) else {}
+    after = after if isinstance(after, Mapping) else {}
+    added = sorted(key for key in after if key not in before)
+    removed = sorted(key for key in before if key not in after)
+    changed = sorted(key for key in after if key in before and before[key] != after[key])
+    if not (added or removed or changed):
+        return {}
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def _diff_definitions(before, after):
+    """Compares two sets of definitions, keyed by name.
+
+    Returns:
+        dict: For each definition that changed, its diff as returned by _diff_definition().
+
+    """
+
+    diff = {}
+    for (name, definition) in after.items():
+        changes = _diff_definition(before.get(name), definition)
+        if changes:
+            diff[name] = changes
+    return diff
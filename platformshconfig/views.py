@@ -0,0 +1,159 @@
+from collections.abc import Mapping
+
+__all__ = [
+    "Credentials",
+    "Route"
+]
+
+
+class _View(Mapping):
+    """Base class for the immutable views over decoded Platform.sh definitions.
+
+    The well-known keys of a definition are exposed as attributes. The view also behaves as a read-only mapping over
+    the whole definition, so it can be used wherever the definition dict was used before.
+
+    """
+
+    __slots__ = ()
+
+    """
+    The names of the attributes exposed by the view. Missing keys are exposed as None.
+    """
+    _fields = ()
+
+    """
+    The subset of _fields that is used to compute the hash of the view. These must hold hashable values.
+    """
+    _hashFields = ()
+
+    def __init__(self, definition):
+        """Constructs a view.
+
+        Args:
+            definition (dict):
+                The decoded definition.
+
+        """
+
+        object.__setattr__(self, '_definition', definition)
+        for field in self._fields:
+            object.__setattr__(self, field, definition.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} objects are immutable.'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{0} objects are immutable.'.format(type(self).__name__))
+
+    def __reduce__(self):
+        # Copies and pickles are rebuilt through the constructor, as the view cannot be changed after it.
+        return (type(self), (self._definition,))
+
+    def __getitem__(self, key):
+        return self._definition[key]
+
+    def __iter__(self):
+        return iter(self._definition)
+
+    def __len__(self):
+        return len(self._definition)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, field) for field in self._hashFields))
+
+    def __repr__(self):
+        return '{0}({1})'.format(
+            type(self).__name__,
+            ', '.join('{0}={1!r}'.format(field, getattr(self, field)) for field in self._hashFields
+                      if field != 'password')
+        )
+
+    def to_dict(self):
+        """Returns a mutable copy of the definition.
+
+        Returns:
+            dict: A shallow copy of the definition.
+
+        """
+
+        return dict(self._definition)
+
+
+class Credentials(_View):
+    """An immutable view over the credentials of one relationship endpoint.
+
+    Attributes:
+        scheme (string):
+            The scheme of the service, such as 'mysql' or 'redis'.
+        host (string):
+            The host name of the service.
+        ip (string):
+            The IP address of the service.
+        port (int):
+            The TCP port of the service.
+        path (string):
+            The path, usually the database name.
+        username (string):
+            The user name to authenticate with.
+        password (string):
+            The password to authenticate with.
+        query (dict):
+            Extra query parameters, such as is_master.
+        type (string):
+            The service type, including its version, such as 'mysql:10.2'.
+        rel (string):
+            The endpoint of the service the relationship points to.
+
+    """
+
+    _fields = ('scheme', 'host', 'ip', 'port', 'path', 'username', 'password', 'query', 'type', 'rel')
+    _hashFields = ('scheme', 'host', 'ip', 'port', 'path', 'username', 'password', 'type', 'rel')
+
+    __slots__ = ('_definition',) + _fields
+
+
+class Route(_View):
+    """An immutable view over a route definition.
+
+    The view also exposes the generated URL of the route under the 'url' key.
+
+    Attributes:
+        id (string):
+            The ID of the route, or None.
+        url (string):
+            The generated URL of the route.
+        upstream (string):
+            The upstream that serves the route, for upstream routes.
+        original_url (string):
+            The URL template the route was defined with, such as 'https://www.{default}/'.
+        primary (bool):
+            Whether this is the primary route.
+        type (string):
+            The route type, 'upstream' or 'redirect'.
+        cache (dict):
+            The cache configuration of the route.
+        tls (dict):
+            The TLS configuration of the route.
+
+    """
+
+    _fields = ('id', 'url', 'upstream', 'original_url', 'primary', 'type', 'cache', 'tls')
+    _hashFields = ('id', 'url', 'upstream', 'original_url', 'primary', 'type')
+
+    __slots__ = ('_definition',) + _fields
+
+    def __init__(self, url, definition):
+        """Constructs a route view.
+
+        Args:
+            url (string):
+                The generated URL of the route.
+            definition (dict):
+                The decoded route definition.
+
+        """
+
+        _View.__init__(self, dict(definition, url=url))
+
+    def __reduce__(self):
+        return (type(self), (self.url, self._definition))
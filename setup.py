@@ -44,6 +44,11 @@ setup(
     long_description=__readme__ + '\n\n' + __changelog__,
     packages=find_packages(),
     tests_require=['pytest'],
+    extras_require={
+        'orjson': ['orjson'],
+        'simdjson': ['pysimdjson'],
+        'ujson': ['ujson'],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'License :: OSI Approved :: MIT License',
@@ -54,6 +59,11 @@ setup(
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3 :: Only'
     ],
+    entry_points={
+        'console_scripts': [
+            'platformshconfig = platformshconfig.cli:main',
+        ],
+    },
     cmdclass={
         'verify': VerifyVersionCommand,
     }
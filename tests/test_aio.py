@@ -0,0 +1,186 @@
+import json
+import pickle
+import time
+import base64
+import asyncio
+import unittest
+
+from copy import copy, deepcopy
+
+from platformshconfig import AsyncConfig
+from platformshconfig import BuildTimeVariableAccessException
+from platformshconfig import Config
+from platformshconfig import NoCredentialFormatterFoundException
+
+
+class AsyncConfigTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+        self.servers = []
+        relationships = {}
+        for name in ['database', 'redis', 'search']:
+            server = self.complete(asyncio.start_server(self.serve, '127.0.0.1', 0))
+            self.servers.append(server)
+            relationships[name] = [{
+                'scheme': name,
+                'host': '{0}.internal'.format(name),
+                'ip': '127.0.0.1',
+                'port': server.sockets[0].getsockname()[1],
+            }]
+        self.addCleanup(self.close_servers)
+
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PORT': '8080',
+            'PLATFORM_RELATIONSHIPS': base64.b64encode(json.dumps(relationships).encode('utf-8')),
+        }
+
+    def close_servers(self):
+
+        for server in self.servers:
+            server.close()
+            self.complete(server.wait_closed())
+
+    @staticmethod
+    async def serve(reader, writer):
+
+        writer.write(b'hello\n')
+        await writer.drain()
+        writer.close()
+
+    def complete(self, coroutine):
+
+        return self.loop.run_until_complete(coroutine)
+
+    @staticmethod
+    async def connect(credentials):
+
+        await asyncio.sleep(0.2)
+        (reader, writer) = await asyncio.open_connection(credentials['ip'], credentials['port'])
+        greeting = await reader.readline()
+        writer.close()
+        return greeting
+
+    def test_config_is_wrapped(self):
+
+        config = AsyncConfig(environment_variables=self.environment)
+
+        self.assertTrue(config.in_runtime())
+        self.assertEqual('8080', config.port)
+        self.assertEqual('redis', config.credentials('redis')['scheme'])
+
+    def test_async_formatter(self):
+
+        config = AsyncConfig(Config(self.environment))
+        calls = []
+
+        async def formatter(credentials):
+            calls.append(credentials)
+            return '{0}:{1}'.format(credentials['host'], credentials['port'])
+
+        config.register_formatter('async', formatter)
+        config.register_formatter('sync', lambda credentials: credentials['host'])
+
+        formatted = self.complete(config.formatted_credentials('redis', 'async'))
+        self.assertEqual(formatted, self.complete(config.formatted_credentials('redis', 'async')))
+        self.assertTrue(formatted.startswith('redis.internal:'))
+        self.assertEqual(1, len(calls))
+        self.assertEqual('redis.internal', self.complete(config.formatted_credentials('redis', 'sync')))
+
+        with self.assertRaises(NoCredentialFormatterFoundException):
+            self.complete(config.formatted_credentials('redis', 'missing'))
+
+    def test_async_formatter_after_reload(self):
+
+        config = AsyncConfig(Config(self.environment))
+
+        async def formatter(credentials):
+            return credentials['port']
+
+        config.register_formatter('port', formatter)
+        self.complete(config.formatted_credentials('redis', 'port'))
+
+        relationships = {'redis': [{'scheme': 'redis', 'host': 'redis.internal', 'ip': '127.0.0.1', 'port': 1}]}
+        config.reload(dict(self.environment, PLATFORM_RELATIONSHIPS=base64.b64encode(
+            json.dumps(relationships).encode('utf-8'))))
+
+        self.assertEqual(1, self.complete(config.formatted_credentials('redis', 'port')))
+
+    def test_warmup_connects_concurrently(self):
+
+        config = AsyncConfig(Config(self.environment))
+
+        start = time.monotonic()
+        report = self.complete(config.warmup(self.connect))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual({'database', 'redis', 'search'}, set(report))
+        for result in report.values():
+            self.assertEqual(b'hello\n', result['client'])
+            self.assertIsNone(result['error'])
+            self.assertGreaterEqual(result['elapsed'], 0.2)
+        self.assertLess(elapsed, 0.5)
+
+    def test_warmup_reports_timeouts_and_errors(self):
+
+        config = AsyncConfig(Config(self.environment))
+
+        async def factory(credentials):
+            if credentials['scheme'] == 'redis':
+                await asyncio.sleep(10)
+            if credentials['scheme'] == 'search':
+                raise ConnectionRefusedError('refused')
+            return 'client'
+
+        report = self.complete(config.warmup(factory, relationships=['database', 'redis', 'search', 'missing'],
+                                        timeout=0.1))
+
+        self.assertEqual('client', report['database']['client'])
+        self.assertIsInstance(report['redis']['error'], asyncio.TimeoutError)
+        self.assertLess(report['redis']['elapsed'], 1)
+        self.assertIsInstance(report['search']['error'], ConnectionRefusedError)
+        self.assertIsInstance(report['missing']['error'], KeyError)
+
+    def test_warmup_runs_blocking_factories_concurrently(self):
+
+        config = AsyncConfig(Config(self.environment))
+
+        def factory(credentials):
+            time.sleep(0.3 if credentials['scheme'] == 'redis' else 0.2)
+            return credentials['scheme']
+
+        start = time.monotonic()
+        report = self.complete(config.warmup(factory, timeout=0.25))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual('database', report['database']['client'])
+        self.assertEqual('search', report['search']['client'])
+        self.assertIsInstance(report['redis']['error'], asyncio.TimeoutError)
+        self.assertIsNone(report['redis']['client'])
+        self.assertLess(elapsed, 0.3)
+
+    def test_can_be_copied_and_pickled(self):
+
+        config = AsyncConfig(Config(self.environment))
+
+        for duplicate in [copy(config), deepcopy(config), pickle.loads(pickle.dumps(config))]:
+            self.assertEqual('8080', duplicate.port)
+            self.assertEqual('redis', duplicate.credentials('redis')['scheme'])
+
+    def test_warmup_is_unavailable_at_build_time(self):
+
+        environment = dict(self.environment)
+        del environment['PLATFORM_ENVIRONMENT']
+        config = AsyncConfig(Config(environment))
+
+        with self.assertRaises(BuildTimeVariableAccessException):
+            self.complete(config.warmup(lambda credentials: 'client'))
+
+
+if __name__ == "__main__":
+    unittest.main()
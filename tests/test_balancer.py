@@ -0,0 +1,200 @@
+import json
+import base64
+import socket
+import threading
+import unittest
+
+from collections import Counter
+
+from platformshconfig import Balancer
+from platformshconfig import Config
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BalancerTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.listeners = [self.listener() for _ in range(3)]
+        relationships = {
+            'database': [self.endpoint(listener, 'replica{0}'.format(i))
+                         for (i, listener) in enumerate(self.listeners)],
+            'single': [self.endpoint(self.listeners[0], 'single')],
+        }
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_RELATIONSHIPS': self.encode(relationships),
+        }
+
+    def listener(self):
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(64)
+        self.addCleanup(sock.close)
+        return sock
+
+    @staticmethod
+    def endpoint(listener, rel):
+
+        return {'scheme': 'mysql', 'host': 'localhost', 'ip': '127.0.0.1', 'port': listener.getsockname()[1],
+                'path': 'main', 'username': 'user', 'password': '', 'rel': rel, 'type': 'mysql:10.2'}
+
+    @staticmethod
+    def encode(value):
+
+        return base64.b64encode(json.dumps(value).encode('utf-8'))
+
+    @staticmethod
+    def connect(credentials):
+
+        sock = socket.create_connection((credentials['ip'], credentials['port']), timeout=5)
+        sock.close()
+
+    def test_round_robin_connects_to_every_listener(self):
+
+        config = Config(self.environment)
+
+        ports = []
+        for _ in range(6):
+            with config.endpoint('database') as lease:
+                self.connect(lease.credentials)
+                ports.append(lease.credentials['port'])
+
+        expected = [listener.getsockname()[1] for listener in self.listeners]
+        self.assertEqual(expected * 2, ports)
+        self.assertEqual([0, 0, 0], [state['inflight'] for state in config.balancer('database').stats()])
+
+    def test_random_uses_every_endpoint(self):
+
+        config = Config(self.environment)
+
+        counts = Counter(config.endpoint('database', 'random').index for _ in range(300))
+
+        self.assertEqual({0, 1, 2}, set(counts))
+
+    def test_least_inflight(self):
+
+        config = Config(self.environment)
+
+        first = config.endpoint('database', 'least_inflight')
+        second = config.endpoint('database', 'least_inflight')
+        third = config.endpoint('database', 'least_inflight')
+        self.assertEqual({0, 1, 2}, {first.index, second.index, third.index})
+
+        second.success()
+        self.assertEqual(second.index, config.endpoint('database', 'least_inflight').index)
+
+    def test_latency_prefers_the_fastest_endpoint(self):
+
+        config = Config(self.environment)
+
+        for (index, latency) in enumerate((0.05, 0.001, 0.02)):
+            lease = config.endpoint('database', 'latency')
+            self.assertEqual(index, lease.index)
+            lease.success(latency)
+
+        self.assertEqual([1] * 5, [config.endpoint('database', 'latency').index for _ in range(5)])
+
+        balancer = config.balancer('database')
+        for _ in range(10):
+            balancer.report(1, True, 0.5)
+        self.assertEqual(2, config.endpoint('database', 'latency').index)
+
+    def test_failing_endpoint_is_ejected(self):
+
+        clock = FakeClock()
+        config = Config(self.environment)
+        balancer = config._balancers[('database', None)] = Balancer(
+            lambda index: config.addressed_credentials('database', index), 3, max_failures=2, ejection_time=10.0,
+            clock=clock)
+
+        self.listeners[1].close()
+        failed = []
+        for _ in range(12):
+            try:
+                with config.endpoint('database') as lease:
+                    self.connect(lease.credentials)
+            except OSError:
+                failed.append(lease.index)
+
+        self.assertEqual([1, 1], failed)
+        self.assertTrue(balancer.stats()[1]['ejected'])
+
+        # After the ejection, a single failure ejects the endpoint again.
+        clock.now += 11
+        self.assertIn(1, [config.endpoint('database').index for _ in range(3)])
+        config.balancer('database').report(1, False)
+        self.assertNotIn(1, [config.endpoint('database').index for _ in range(6)])
+
+    def test_every_endpoint_ejected_fails_open(self):
+
+        clock = FakeClock()
+        balancer = Balancer(lambda index: index, 2, max_failures=1, ejection_time=10.0, clock=clock)
+
+        balancer.select().failure()
+        clock.now += 1
+        balancer.select().failure()
+
+        self.assertEqual([True, True], [state['ejected'] for state in balancer.stats()])
+        self.assertEqual(0, balancer.select().index)
+
+    def test_balancer_is_shared_and_replaced_on_reload(self):
+
+        config = Config(self.environment)
+        balancer = config.balancer('database')
+
+        self.assertIs(balancer, config.balancer('database'))
+        self.assertIsNot(balancer, config.balancer('database', formatter='pymongo'))
+
+        relationships = {'database': [self.endpoint(self.listeners[2], 'replica')],
+                         'single': [self.endpoint(self.listeners[0], 'single')]}
+        config.reload(dict(self.environment, PLATFORM_RELATIONSHIPS=self.encode(relationships)))
+
+        self.assertIsNot(balancer, config.balancer('database'))
+        self.assertEqual(1, len(config.balancer('database').stats()))
+        self.assertEqual(self.listeners[2].getsockname()[1], config.endpoint('database').credentials['port'])
+
+    def test_invalid_arguments(self):
+
+        config = Config(self.environment)
+
+        with self.assertRaises(ValueError):
+            config.endpoint('database', 'fastest')
+        with self.assertRaises(KeyError):
+            config.endpoint('missing')
+        self.assertEqual([0, 0, 0], [state['inflight'] for state in config.balancer('database').stats()])
+
+    def test_concurrent_selection(self):
+
+        config = Config(self.environment)
+        errors = []
+
+        def run():
+            try:
+                for _ in range(200):
+                    with config.endpoint('database', 'least_inflight') as lease:
+                        self.assertEqual(lease.index, ['replica0', 'replica1', 'replica2'].index(
+                            lease.credentials['rel']))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        stats = config.balancer('database').stats()
+        self.assertEqual(1600, sum(state['selected'] for state in stats))
+        self.assertEqual([0, 0, 0], [state['inflight'] for state in stats])
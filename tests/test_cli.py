@@ -0,0 +1,139 @@
+import io
+import os
+import sys
+import json
+import base64
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from platformshconfig import Config
+from platformshconfig import clear_decode_cache
+from platformshconfig.cli import main
+
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+
+        clear_decode_cache()
+        self.addCleanup(clear_decode_cache)
+
+        relationships = {
+            'database': [{'scheme': 'mysql', 'host': 'database.internal', 'ip': '10.0.0.1', 'port': 3306,
+                          'path': 'main', 'username': 'user', 'password': "it's secret"}],
+            'mongodb': [{'scheme': 'mongodb', 'host': 'mongodb.internal', 'ip': '10.0.0.2', 'port': 27017,
+                         'path': 'main'}],
+        }
+        routes = {
+            'https://www.example.com/': {'type': 'upstream', 'upstream': 'app', 'id': 'main', 'primary': True,
+                                         'original_url': 'https://www.{default}/'},
+        }
+        application = {'name': 'app', 'web': {'locations': {'/': {'root': 'public'}}}}
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_BRANCH': 'main',
+            'PORT': '8080',
+            'PLATFORM_RELATIONSHIPS': self.encode(relationships),
+            'PLATFORM_ROUTES': self.encode(routes),
+            'PLATFORM_VARIABLES': self.encode({'env:FOO': 'bar', 'feature': {'enabled': True}}),
+            'PLATFORM_APPLICATION': self.encode(application),
+        }
+
+    @staticmethod
+    def encode(value):
+
+        return base64.b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    def run_cli(self, *argv):
+
+        (stdout, stderr) = (io.StringIO(), io.StringIO())
+        status = main(list(argv), self.environment, stdout, stderr)
+        return (status, stdout.getvalue(), stderr.getvalue())
+
+    def test_get_lines(self):
+
+        (status, stdout, _) = self.run_cli(
+            'get', 'credentials.database.host', 'credentials.database.0.port', 'routes.primary.url',
+            'routes.main.upstream', 'var.env:FOO', 'var.feature', 'app.web.locations./.root', 'port', 'branch',
+            'formatted.mongodb.pymongo')
+
+        self.assertEqual(0, status)
+        self.assertEqual([
+            'database.internal', '3306', 'https://www.example.com/', 'app', 'bar', '{"enabled":true}', 'public',
+            '8080', 'main', 'mongodb.internal:27017/main',
+        ], stdout.splitlines())
+
+    def test_get_export(self):
+
+        (status, stdout, _) = self.run_cli(
+            'get', '--format', 'export', 'DB_PASSWORD=credentials.database.password', 'routes.primary.url')
+
+        self.assertEqual(0, status)
+        self.assertEqual("export DB_PASSWORD='it'\"'\"'s secret'\n"
+                         "export ROUTES_PRIMARY_URL=https://www.example.com/\n", stdout)
+
+        output = subprocess.run(['sh', '-c', stdout + 'printf %s "$DB_PASSWORD"'], stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True).stdout
+        self.assertEqual("it's secret", output)
+
+    def test_get_json(self):
+
+        (status, stdout, _) = self.run_cli('get', '--format', 'json', 'credentials.database.port', 'var.feature')
+
+        self.assertEqual(0, status)
+        self.assertEqual({'credentials.database.port': 3306, 'var.feature': {'enabled': True}}, json.loads(stdout))
+
+    def test_get_nul(self):
+
+        (status, stdout, _) = self.run_cli('get', '--format', 'nul', 'branch', 'port')
+
+        self.assertEqual(0, status)
+        self.assertEqual('main\x008080\x00', stdout)
+
+    def test_missing_keys(self):
+
+        (status, stdout, stderr) = self.run_cli('get', 'credentials.redis.host', 'var.missing', 'routes.main.nope',
+                                                'port', 'unknownProperty', 'nope.key')
+
+        self.assertEqual(1, status)
+        self.assertEqual('', stdout)
+        self.assertEqual(5, len(stderr.splitlines()))
+        self.assertIn('credentials.redis.host', stderr)
+
+        (status, stdout, _) = self.run_cli('get', '--allow-missing', '--format', 'json', 'var.missing', 'port')
+
+        self.assertEqual(0, status)
+        self.assertEqual({'var.missing': None, 'port': '8080'}, json.loads(stdout))
+
+    def test_only_touched_definitions_are_decoded(self):
+
+        self.environment['PLATFORM_ROUTES'] = 'not base64 JSON'
+
+        (status, stdout, _) = self.run_cli('get', 'credentials.database.host')
+
+        self.assertEqual(0, status)
+        self.assertEqual('database.internal\n', stdout)
+
+    def test_snapshot(self):
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'config.snapshot')
+        Config(self.environment).save_snapshot(path)
+
+        (status, stdout, _) = self.run_cli('--snapshot', path, 'get', 'credentials.database.host')
+
+        self.assertEqual(0, status)
+        self.assertEqual('database.internal\n', stdout)
+
+    def test_module_entry_point(self):
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root, **self.environment)
+        result = subprocess.run([sys.executable, '-m', 'platformshconfig', 'get', 'port', 'var.env:FOO'],
+                                env=env, stdout=subprocess.PIPE, universal_newlines=True, check=True)
+
+        self.assertEqual('8080\nbar\n', result.stdout)
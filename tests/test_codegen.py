@@ -0,0 +1,172 @@
+import io
+import os
+import json
+import base64
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+from unittest import mock
+
+from platformshconfig import Config
+from platformshconfig import NotValidPlatformException
+from platformshconfig.cli import main
+from platformshconfig.codegen import generate
+
+
+class CodegenTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, '_platform_settings.py')
+
+        self.relationships = {
+            'database': [{'scheme': 'mysql', 'host': 'database.internal', 'ip': '10.0.0.1', 'port': 3306,
+                          'path': 'main', 'username': 'user', 'password': 'one'}],
+            'mongodb': [{'scheme': 'mongodb', 'host': 'mongodb.internal', 'ip': '10.0.0.2', 'port': 27017,
+                         'path': 'main'}],
+        }
+        routes = {
+            'https://www.example.com/': {'type': 'upstream', 'upstream': 'app', 'id': 'main', 'primary': True},
+            'https://api.example.com/': {'type': 'upstream', 'upstream': 'api', 'id': 'api'},
+            'http://www.example.com/': {'type': 'redirect', 'to': 'https://www.example.com/'},
+        }
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_BRANCH': 'main',
+            'PORT': '8080',
+            'PLATFORM_RELATIONSHIPS': self.encode(self.relationships),
+            'PLATFORM_ROUTES': self.encode(routes),
+            'PLATFORM_VARIABLES': self.encode({'env:FOO': 'bar', 'secret': 'hidden'}),
+        }
+
+    @staticmethod
+    def encode(value):
+
+        return base64.b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    def load(self, environment):
+
+        spec = importlib.util.spec_from_file_location('_platform_settings', self.path)
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, environment, clear=True):
+            spec.loader.exec_module(module)
+        return module
+
+    def test_generated_module(self):
+
+        generate(Config(self.environment), self.path, formatters=[('mongodb', 'pymongo')], variables=['env:FOO'])
+
+        with mock.patch('platformshconfig.config._decode_shared', side_effect=AssertionError('decoded')):
+            settings = self.load(self.environment)
+
+        self.assertTrue(settings.FRESH)
+        self.assertEqual('database.internal', settings.CREDENTIALS['database']['host'])
+        self.assertEqual(self.relationships, settings.RELATIONSHIPS)
+        self.assertEqual('mongodb.internal:27017/main', settings.FORMATTED['mongodb']['pymongo'])
+        self.assertEqual({'main': 'https://www.example.com/', 'api': 'https://api.example.com/'}, settings.ROUTES)
+        self.assertEqual('https://www.example.com/', settings.PRIMARY_ROUTE)
+        self.assertEqual({'env:FOO': 'bar'}, settings.VARIABLES)
+        self.assertEqual('8080', settings.PROPERTIES['port'])
+        self.assertEqual('main', settings.PROPERTIES['branch'])
+
+    def test_stale_module_falls_back_to_config(self):
+
+        generate(Config(self.environment), self.path, formatters=[('mongodb', 'pymongo')])
+
+        self.relationships['database'][0]['password'] = 'two'
+        self.relationships['mongodb'][0]['port'] = 27018
+        environment = dict(self.environment, PLATFORM_RELATIONSHIPS=self.encode(self.relationships))
+        settings = self.load(environment)
+
+        self.assertFalse(settings.FRESH)
+        self.assertEqual('two', settings.CREDENTIALS['database']['password'])
+        self.assertEqual('mongodb.internal:27018/main', settings.FORMATTED['mongodb']['pymongo'])
+        self.assertEqual({'env:FOO': 'bar', 'secret': 'hidden'}, settings.VARIABLES)
+
+    def test_stale_module_outside_platform(self):
+
+        generate(Config(self.environment), self.path)
+
+        settings = self.load({})
+
+        self.assertFalse(settings.FRESH)
+        self.assertEqual({}, settings.CREDENTIALS)
+        self.assertIsNone(settings.PRIMARY_ROUTE)
+
+    def test_build_time_module(self):
+
+        environment = {name: value for (name, value) in self.environment.items()
+                       if name not in ('PLATFORM_ENVIRONMENT', 'PLATFORM_BRANCH', 'PORT')}
+        generate(Config(environment), self.path, formatters=[('mongodb', 'pymongo')])
+
+        settings = self.load(environment)
+
+        self.assertTrue(settings.FRESH)
+        self.assertEqual({}, settings.RELATIONSHIPS)
+        self.assertEqual({}, settings.ROUTES)
+        self.assertEqual('app', settings.PROPERTIES['applicationName'])
+        self.assertNotIn('port', settings.PROPERTIES)
+
+    def test_build_time_module_at_runtime(self):
+
+        environment = {name: value for (name, value) in self.environment.items()
+                       if name not in ('PLATFORM_ENVIRONMENT', 'PLATFORM_BRANCH', 'PORT')}
+        generate(Config(environment), self.path, formatters=[('mongodb', 'pymongo')])
+
+        settings = self.load(self.environment)
+
+        # The runtime constants cannot be known at build time, so they are computed on import.
+        self.assertFalse(settings.FRESH)
+        self.assertEqual(self.relationships, settings.RELATIONSHIPS)
+        self.assertEqual('https://www.example.com/', settings.PRIMARY_ROUTE)
+        self.assertEqual('mongodb.internal:27017/main', settings.FORMATTED['mongodb']['pymongo'])
+        self.assertEqual('main', settings.PROPERTIES['branch'])
+        self.assertEqual('8080', settings.PROPERTIES['port'])
+
+    def test_deploy_hook_module_in_web_process(self):
+
+        environment = {name: value for (name, value) in self.environment.items() if name != 'PORT'}
+        generate(Config(environment), self.path)
+
+        web = dict(self.environment, SOCKET='/run/app.sock', PLATFORM_APPLICATION=self.encode({'name': 'app'}))
+        with mock.patch('platformshconfig.config._decode_shared', side_effect=AssertionError('decoded')):
+            settings = self.load(web)
+
+        self.assertTrue(settings.FRESH)
+        self.assertEqual('8080', settings.PROPERTIES['port'])
+        self.assertEqual('/run/app.sock', settings.PROPERTIES['socket'])
+        self.assertEqual(self.relationships, settings.RELATIONSHIPS)
+
+    def test_generate_requires_platform(self):
+
+        with self.assertRaises(NotValidPlatformException):
+            generate(Config({}), self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_cli(self):
+
+        (stdout, stderr) = (io.StringIO(), io.StringIO())
+        status = main(['generate', '--out', self.path, '--formatter', 'mongodb:pymongo', '--variable', 'env:FOO'],
+                      self.environment, stdout, stderr)
+
+        self.assertEqual(0, status, stderr.getvalue())
+        settings = self.load(self.environment)
+        self.assertTrue(settings.FRESH)
+        self.assertEqual({'env:FOO': 'bar'}, settings.VARIABLES)
+        self.assertEqual('mongodb.internal:27017/main', settings.FORMATTED['mongodb']['pymongo'])
+
+    def test_cli_errors(self):
+
+        (stdout, stderr) = (io.StringIO(), io.StringIO())
+
+        self.assertEqual(2, main(['generate', '--out', self.path, '--formatter', 'pymongo'], self.environment,
+                                 stdout, stderr))
+        self.assertEqual(1, main(['generate', '--out', self.path, '--formatter', 'mongodb:missing'],
+                                 self.environment, stdout, stderr))
+        self.assertEqual(1, main(['generate', '--out', self.path], {}, stdout, stderr))
+        self.assertFalse(os.path.exists(self.path))
@@ -1,13 +1,49 @@
 import os
 import json
+import gc
+import pickle
+import sys
 import base64
+import shutil
+import multiprocessing
+import tempfile
+import threading
 import unittest
 
-from copy import deepcopy
+from copy import copy, deepcopy
+from collections.abc import Mapping
 
 from platformshconfig import Config
 from platformshconfig import BuildTimeVariableAccessException
 from platformshconfig import NoCredentialFormatterFoundException
+from platformshconfig import clear_decode_cache
+from platformshconfig import set_decode_cache_size
+from platformshconfig import Credentials
+from platformshconfig import Route
+from platformshconfig import DnsCache
+
+
+# The configuration shared with forked worker processes.
+forkedConfig = None
+
+
+def private_memory():
+    """Returns the private dirty memory of the current process in kB, as reported by /proc/self/smaps_rollup."""
+
+    with open('/proc/self/smaps_rollup') as smaps:
+        return sum(int(line.split()[1]) for line in smaps if line.startswith('Private_Dirty:'))
+
+
+def forked_worker(_):
+    """Reads a few values from the shared configuration, then reports how much private memory that cost."""
+
+    before = private_memory()
+    if forkedConfig is not None:
+        forkedConfig.credentials('database')
+        forkedConfig.get_route('main')
+        forkedConfig.application()['name']
+    gc.collect()
+    return private_memory() - before
 
 
 class ConfigTest(unittest.TestCase):
@@ -117,6 +153,52 @@ class ConfigTest(unittest.TestCase):
         with self.assertRaises(KeyError):
             config.get_route('missing')
 
+    def test_get_route_does_not_modify_routes(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+        route = config.get_route('main')
+
+        self.assertEqual('https://www.master-7rqtwti-gcpjkefjk4wc2.us-2.platformsh.site/', route['url'])
+        for definition in config.routes().values():
+            self.assertNotIn('url', definition)
+
+    def test_get_route_by_original_url_works(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+        route = config.get_route_by_original_url('http://{default}/')
+
+        self.assertEqual('http://master-7rqtwti-gcpjkefjk4wc2.us-2.platformsh.site/', route['url'])
+
+        with self.assertRaises(KeyError):
+            config.get_route_by_original_url('https://missing.{default}/')
+
+    def test_routes_for_upstream_works(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual(['main'], [route['id'] for route in config.routes_for_upstream('app')])
+        self.assertEqual([], config.routes_for_upstream('missing'))
+
+    def test_primary_route_works(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual('main', config.primary_route()['id'])
+
+    def test_typed_route_returns_route_object(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        route = config.typed_route('main')
+
+        self.assertIsInstance(route, Route)
+        self.assertEqual('https://www.master-7rqtwti-gcpjkefjk4wc2.us-2.platformsh.site/', route.url)
+        self.assertEqual('app', route.upstream)
+        self.assertTrue(route.primary)
+        self.assertEqual(route.url, route['url'])
+        self.assertEqual(set(config.routes()), set(config.typed_routes()))
+        self.assertEqual(hash(route), hash(Config(self.mockEnvironmentDeploy).typed_route('main')))
+
     def test_onenterprise_returns_true_on_enterprise(self):
 
         env = self.mockEnvironmentDeploy
@@ -184,6 +266,50 @@ class ConfigTest(unittest.TestCase):
         self.assertEqual('mysql', creds['scheme'])
         self.assertEqual('mysql:10.2', creds['type'])
 
+    def test_typed_credentials_returns_credentials_object(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        creds = config.typed_credentials('database')
+
+        self.assertIsInstance(creds, Credentials)
+        self.assertEqual('mysql', creds.scheme)
+        self.assertEqual(3306, creds.port)
+        self.assertEqual('mysql', creds['scheme'])
+        self.assertEqual('ihq65cmi2m7nd3svqpcrbjchyy.mysql.service._.us-2.platformsh.site', creds['hostname'])
+        self.assertEqual(config.credentials('database'), creds)
+        self.assertIs(creds, config.typed_credentials('database'))
+
+    def test_typed_credentials_are_immutable_and_hashable(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        creds = config.typed_credentials('database')
+
+        with self.assertRaises(AttributeError):
+            creds.host = 'elsewhere'
+        with self.assertRaises(TypeError):
+            creds['host'] = 'elsewhere'
+        self.assertEqual({creds: 'pool'}[Config(self.mockEnvironmentDeploy).typed_credentials('database')], 'pool')
+
+    def test_views_can_be_copied_and_pickled(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        for view in [config.typed_credentials('database'), config.typed_route('main')]:
+            for duplicate in [copy(view), deepcopy(view), pickle.loads(pickle.dumps(view))]:
+                self.assertIs(type(view), type(duplicate))
+                self.assertEqual(view, duplicate)
+                self.assertEqual(hash(view), hash(duplicate))
+                self.assertEqual(repr(view), repr(duplicate))
+
+    def test_typed_credentials_missing_relationship_throws(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        with self.assertRaises(KeyError):
+            config.typed_credentials('does-not-exist')
+
     def test_credentials_missing_relationship_throws(self):
 
         env = self.mockEnvironmentDeploy
@@ -202,6 +328,96 @@ class ConfigTest(unittest.TestCase):
         with self.assertRaises(KeyError):
             config.credentials('database', 3)
 
+    def test_config_can_be_copied_and_pickled(self):
+
+        for env in (self.mockEnvironmentDeploy, self.mockEnvironmentBuild, {}):
+            config = Config(env)
+            if config.in_runtime():
+                config.credentials('database')
+                config.pool('database', dict)
+            for clone in (copy(config), deepcopy(config), pickle.loads(pickle.dumps(config))):
+                self.assertEqual(config.is_valid_platform(), clone.is_valid_platform())
+                self.assertEqual(config.in_runtime(), clone.in_runtime())
+                if config.is_valid_platform():
+                    self.assertEqual(config.applicationName, clone.applicationName)
+                if config.in_runtime():
+                    self.assertEqual(config.port, clone.port)
+                    self.assertEqual(config.credentials('database'), clone.credentials('database'))
+
+    def test_private_names_are_not_properties(self):
+
+        with self.assertRaises(AttributeError):
+            Config({})._missing
+        with self.assertRaises(AttributeError):
+            Config(self.mockEnvironmentDeploy).__setstate__
+
+    def test_credentials_index_is_checked_against_the_relationship(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        with self.assertRaises(KeyError):
+            config.credentials('database', 1)
+
+    def test_credentials_all_returns_every_endpoint(self):
+
+        env = deepcopy(self.mockEnvironmentDeploy)
+        relationships = self.loadJsonFile('PLATFORM_RELATIONSHIPS')
+        replica = dict(relationships['database'][0], host='replica.internal', rel='replica')
+        relationships['database'].append(replica)
+        env['PLATFORM_RELATIONSHIPS'] = self.encode(relationships)
+
+        config = Config(env)
+
+        self.assertEqual(['database.internal', 'replica.internal'],
+                         [endpoint['host'] for endpoint in config.credentials_all('database')])
+        self.assertEqual('replica.internal', config.credentials('database', 1)['host'])
+        with self.assertRaises(KeyError):
+            config.credentials_all('does-not-exist')
+
+        relationships['empty'] = []
+        config = Config(dict(env, PLATFORM_RELATIONSHIPS=self.encode(relationships)))
+        self.assertEqual([], config.credentials_all('empty'))
+        with self.assertRaises(KeyError):
+            config.credentials('empty')
+
+    def test_credentials_many(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        credentials = config.credentials_many(['database', ('mongodb', 0)])
+
+        self.assertEqual('database.internal', credentials['database']['host'])
+        self.assertEqual('mongodb.internal', credentials[('mongodb', 0)]['host'])
+        with self.assertRaises(KeyError):
+            config.credentials_many(['database', 'does-not-exist'])
+
+    def test_relationships_by_type(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual(['database'], config.relationships_by_type('mysql'))
+        self.assertEqual(['database'], config.relationships_by_type('mysql:10.2'))
+        self.assertEqual([], config.relationships_by_type('mysql:5.7'))
+        self.assertEqual(['mongodb'], config.relationships_by_type('mongodb'))
+
+    def test_find_credentials(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual(['elasticsearch.internal'],
+                         [endpoint['host'] for endpoint in config.find_credentials(scheme='http')])
+        self.assertEqual(['database.internal'],
+                         [endpoint['host'] for endpoint in config.find_credentials(type='mysql', rel='mysql')])
+        self.assertEqual([], config.find_credentials(service='mysql', rel='mongodb'))
+        self.assertEqual(3, len(config.find_credentials()))
+
+    def test_relationship_index_is_unavailable_at_build_time(self):
+
+        config = Config(self.mockEnvironmentBuild)
+
+        with self.assertRaises(BuildTimeVariableAccessException):
+            config.relationships_by_type('mysql')
+
     def test_has_relationship_returns_true_for_existing_relationship(self):
 
         env = self.mockEnvironmentDeploy
@@ -294,6 +510,43 @@ class ConfigTest(unittest.TestCase):
         self.assertTrue(hasattr(config, 'port'))
         self.assertTrue(hasattr(config, 'socket'))
 
+    def test_get_many_returns_properties_in_order(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual(('8080', 'app', 'feature-x'), config.get_many('port', 'applicationName', 'branch'))
+
+    def test_get_many_throws_like_properties(self):
+
+        config = Config(self.mockEnvironmentBuild)
+
+        with self.assertRaises(BuildTimeVariableAccessException):
+            config.get_many('project', 'branch')
+        with self.assertRaises(AttributeError):
+            config.get_many('project', 'missing')
+
+    def test_isset_depends_on_phase(self):
+
+        build = Config(self.mockEnvironmentBuild)
+        deploy = Config(self.mockEnvironmentDeploy)
+
+        self.assertTrue(build.isset('project'))
+        self.assertFalse(build.isset('branch'))
+        self.assertTrue(deploy.isset('branch'))
+        self.assertTrue(deploy.isset('port'))
+        self.assertFalse(deploy.isset('missing'))
+        self.assertFalse(Config({}).isset('project'))
+
+    def test_phase_is_computed_on_construction(self):
+
+        env = self.mockEnvironmentBuild
+        config = Config(env)
+
+        env['PLATFORM_ENVIRONMENT'] = 'feature-x-hgi456'
+
+        self.assertTrue(config.in_build())
+        self.assertFalse(config.in_runtime())
+
     def test_deploy_property_in_build_throws(self):
 
         env = self.mockEnvironmentBuild
@@ -337,6 +590,76 @@ class ConfigTest(unittest.TestCase):
 
         self.assertEqual('python:3.7', app['type'])
 
+    def test_application_get_by_path(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual('web', config.application_get('web.locations./.root'))
+        self.assertEqual('pdo_pgsql', config.application_get('runtime.extensions.1'))
+        self.assertEqual('web', config.application_get(('web', 'locations', '/', 'root')))
+        self.assertEqual(config.application()['hooks'], config.application_get('hooks'))
+
+    def test_application_get_missing_path_returns_default(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertIsNone(config.application_get('web.missing'))
+        self.assertEqual('default-val', config.application_get('runtime.extensions.10', 'default-val'))
+        self.assertEqual('default-val', config.application_get('disk.size', 'default-val'))
+
+    def test_application_get_with_mapped_snapshot(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        Config(self.mockEnvironmentDeploy).save_snapshot(path)
+        config = Config.from_snapshot(path, self.mockEnvironmentDeploy, mapped=True)
+
+        self.assertEqual('web', config.application_get('web.locations./.root'))
+
+    def test_mapped_snapshot_can_be_saved_again(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+        other = os.path.join(tmp_dir, 'other.snapshot')
+
+        original = Config(self.mockEnvironmentDeploy)
+        original.save_snapshot(path)
+        mapped = Config.from_snapshot(path, self.mockEnvironmentDeploy, mapped=True)
+        mapped.save_snapshot(other)
+        config = Config.from_snapshot(other, self.mockEnvironmentDeploy)
+
+        self.assertIs(mapped.credentials('database'), mapped.credentials('database'))
+        self.assertEqual(original.credentials('database'), config.credentials('database'))
+        self.assertEqual(original.routes(), config.routes())
+        self.assertEqual(original.application(), config.application())
+
+    def test_gc_is_paused_for_large_decodes_only(self):
+
+        from platformshconfig.config import _paused_gc, _GC_PAUSE_MIN_SIZE
+
+        self.assertTrue(gc.isenabled())
+        with _paused_gc(_GC_PAUSE_MIN_SIZE - 1):
+            self.assertTrue(gc.isenabled())
+
+        # Overlapping pauses, as in concurrent decodes, enable the collector again when the last one ends.
+        first = _paused_gc(_GC_PAUSE_MIN_SIZE)
+        second = _paused_gc(_GC_PAUSE_MIN_SIZE)
+        first.__enter__()
+        second.__enter__()
+        first.__exit__(None, None, None)
+        self.assertFalse(gc.isenabled())
+        second.__exit__(None, None, None)
+        self.assertTrue(gc.isenabled())
+
+        gc.disable()
+        self.addCleanup(gc.enable)
+        with _paused_gc(_GC_PAUSE_MIN_SIZE):
+            pass
+        self.assertFalse(gc.isenabled())
+
     def test_invalid_json_throws(self):
 
         with self.assertRaises(TypeError):
@@ -371,6 +694,44 @@ class ConfigTest(unittest.TestCase):
 
         self.assertEqual('called', formatted)
 
+    def test_formatted_credentials_are_cached(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+        calls = []
+
+        def formatter(credentials):
+            calls.append(credentials)
+            return credentials['host']
+
+        config.register_formatter('counted', formatter)
+
+        self.assertEqual('database.internal', config.formatted_credentials('database', 'counted'))
+        self.assertEqual('database.internal', config.formatted_credentials('database', 'counted'))
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1}, config.formatter_cache_info())
+
+    def test_register_formatter_invalidates_cached_credentials(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        config.register_formatter('replaced', lambda credentials: 'first')
+        self.assertEqual('first', config.formatted_credentials('database', 'replaced'))
+
+        config.register_formatter('replaced', lambda credentials: 'second')
+        self.assertEqual('second', config.formatted_credentials('database', 'replaced'))
+
+    def test_uncached_formatter_runs_every_time(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+        calls = []
+
+        config.register_formatter('uncached', lambda credentials: calls.append(credentials), cache=False)
+        config.formatted_credentials('database', 'uncached')
+        config.formatted_credentials('database', 'uncached')
+
+        self.assertEqual(2, len(calls))
+        self.assertEqual(0, config.formatter_cache_info()['size'])
+
     def test_pymongo_formatter(self):
 
         config = Config(self.mockEnvironmentDeploy)
@@ -379,6 +740,289 @@ class ConfigTest(unittest.TestCase):
 
         self.assertEqual('mongodb.internal:27017/main', formatted)  # include formatted string
 
+    def test_blobs_are_not_decoded_on_construction(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertTrue(config.is_valid_platform())
+        self.assertEqual('8080', config.port)
+        self.assertEqual({}, config._decodedDefs)
+
+    def test_blobs_are_decoded_once_on_demand(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        config.credentials('database')
+        self.assertEqual(['RELATIONSHIPS'], list(config._decodedDefs))
+
+        routes = config.routes()
+        self.assertIs(routes, config.routes())
+
+    def test_invalid_blob_is_not_decoded_until_used(self):
+
+        env = self.mockEnvironmentDeploy
+        env['PLATFORM_ROUTES'] = 'not base64'
+
+        config = Config(env)
+
+        self.assertEqual('someval', config.variable('somevar'))
+
+    def test_decoded_blobs_are_shared_between_instances(self):
+
+        first = Config(self.mockEnvironmentDeploy)
+        second = Config(self.mockEnvironmentDeploy)
+
+        self.assertIs(first.routes(), second.routes())
+
+    def test_decoded_blobs_are_read_only(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        with self.assertRaises(TypeError):
+            config.variables()['somevar'] = 'changed'
+        with self.assertRaises(TypeError):
+            config.credentials('database')['port'] = 1
+        with self.assertRaises(TypeError):
+            config.application()['runtime']['extensions'].append('pgsql')
+
+    def test_changed_blob_is_decoded_again(self):
+
+        first = Config(self.mockEnvironmentDeploy)
+        first.routes()
+        first.variables()
+
+        env = deepcopy(self.mockEnvironmentDeploy)
+        env['PLATFORM_VARIABLES'] = self.encode({'somevar': 'otherval'})
+        second = Config(env)
+
+        self.assertIs(first.routes(), second.routes())
+        self.assertEqual('someval', first.variable('somevar'))
+        self.assertEqual('otherval', second.variable('somevar'))
+
+    def test_clear_decode_cache(self):
+
+        first = Config(self.mockEnvironmentDeploy)
+        routes = first.routes()
+
+        clear_decode_cache()
+        second = Config(self.mockEnvironmentDeploy)
+
+        self.assertIsNot(routes, second.routes())
+        self.assertEqual(routes, second.routes())
+
+    def test_decode_cache_size_is_bounded(self):
+
+        try:
+            set_decode_cache_size(1)
+            routes = Config(self.mockEnvironmentDeploy).routes()
+            Config(self.mockEnvironmentDeploy).variables()
+
+            self.assertIsNot(routes, Config(self.mockEnvironmentDeploy).routes())
+        finally:
+            set_decode_cache_size(32)
+
+    def test_snapshot_round_trip(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        Config(self.mockEnvironmentDeploy).save_snapshot(path)
+        clear_decode_cache()
+        config = Config.from_snapshot(path, self.mockEnvironmentDeploy)
+
+        self.assertEqual(['APPLICATION', 'RELATIONSHIPS', 'ROUTES', 'VARIABLES'], sorted(config._decodedDefs))
+        self.assertEqual('mysql', config.credentials('database')['scheme'])
+        self.assertEqual('main', config.get_route('main')['id'])
+        self.assertEqual('someval', config.variable('somevar'))
+        self.assertEqual('python:3.7', config.application()['type'])
+        self.assertIs(config.routes(), Config(self.mockEnvironmentDeploy).routes())
+
+    def test_stale_snapshot_falls_back_to_environment(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        Config(self.mockEnvironmentDeploy).save_snapshot(path)
+
+        env = deepcopy(self.mockEnvironmentDeploy)
+        env['PLATFORM_VARIABLES'] = self.encode({'somevar': 'otherval'})
+        config = Config.from_snapshot(path, env)
+
+        self.assertEqual({}, config._decodedDefs)
+        self.assertEqual('otherval', config.variable('somevar'))
+
+    def test_snapshot_saved_in_hook_is_used_by_web_workers(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        hook = {name: value for (name, value) in self.mockEnvironmentDeploy.items() if name not in ('PORT', 'SOCKET')}
+        Config(hook).save_snapshot(path)
+        web = dict(self.mockEnvironmentDeploy, PLATFORM_MODE='enterprise')
+        config = Config.from_snapshot(path, web)
+
+        self.assertEqual(['APPLICATION', 'RELATIONSHIPS', 'ROUTES', 'VARIABLES'], sorted(config._decodedDefs))
+        self.assertEqual('8080', config.port)
+
+        # A snapshot saved in another phase is not used.
+        Config(self.mockEnvironmentBuild).save_snapshot(path)
+        self.assertEqual({}, Config.from_snapshot(path, web)._decodedDefs)
+
+    def test_invalid_snapshot_falls_back_to_environment(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        with open(path, 'wb') as snapshot:
+            snapshot.write(b'not a snapshot')
+
+        for snapshot_path in [path, os.path.join(tmp_dir, 'missing')]:
+            config = Config.from_snapshot(snapshot_path, self.mockEnvironmentDeploy)
+
+            self.assertEqual({}, config._decodedDefs)
+            self.assertEqual('someval', config.variable('somevar'))
+
+    def test_mapped_snapshot_decodes_on_access(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        Config(self.mockEnvironmentDeploy).save_snapshot(path)
+        config = Config.from_snapshot(path, self.mockEnvironmentDeploy, mapped=True)
+
+        routes = config.routes()
+        self.assertIsInstance(routes, Mapping)
+        self.assertNotIsInstance(routes, dict)
+        self.assertEqual(Config(self.mockEnvironmentDeploy).routes(), dict(routes))
+        self.assertEqual('mysql', config.credentials('database')['scheme'])
+        self.assertTrue(config.has_relationship('database'))
+        self.assertEqual('main', config.get_route('main')['id'])
+        self.assertEqual('python:3.7', config.application()['type'])
+
+        with self.assertRaises(TypeError):
+            config.application()['runtime']['extensions'].append('pgsql')
+
+    @unittest.skipUnless(os.path.exists('/proc/self/smaps_rollup') and hasattr(os, 'fork'),
+                         'Needs fork() and /proc/self/smaps_rollup.')
+    def test_mapped_snapshot_keeps_forked_workers_small(self):
+
+        global forkedConfig
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'config.snapshot')
+
+        env = self.mockEnvironmentDeploy
+        application = self.loadJsonFile('PLATFORM_APPLICATION')
+        application['web'] = {'locations': {}}
+        for i in range(30000):
+            application['web']['locations']['/static{}'.format(i)] = {
+                'root': 'static/{}'.format(i), 'expires': '1d', 'rules': {'\\.css$': {'expires': '1w'}}
+            }
+        env['PLATFORM_APPLICATION'] = self.encode(application)
+        del application
+        Config(env).save_snapshot(path)
+        gc.collect()
+
+        usage = {}
+        context = multiprocessing.get_context('fork')
+        for mapped in (None, False, True):
+            clear_decode_cache()
+            if mapped is None:
+                # The baseline: what the garbage collector and the pool cost on their own.
+                forkedConfig = None
+            else:
+                forkedConfig = Config.from_snapshot(path, env, mapped=mapped)
+                forkedConfig.application()
+            with context.Pool(4) as pool:
+                usage[mapped] = max(pool.map(forked_worker, range(4), chunksize=1))
+        forkedConfig = None
+        clear_decode_cache()
+
+        self.assertLess(usage[True] - usage[None], (usage[False] - usage[None]) / 4)
+
+    def test_default_addressing_keeps_formatter_behavior(self):
+
+        config = Config(self.mockEnvironmentDeploy)
+
+        self.assertEqual('mongodb.internal:27017/main', config.formatted_credentials('mongodb', 'pymongo'))
+        self.assertEqual('http://169.254.106.124:27017/main', config.formatted_credentials('mongodb', 'pysolr'))
+
+    def test_ip_and_host_addressing_apply_to_all_formatters(self):
+
+        config = Config(self.mockEnvironmentDeploy, addressing='ip')
+
+        self.assertEqual('169.254.106.124:27017/main', config.formatted_credentials('mongodb', 'pymongo'))
+        self.assertEqual('http://169.254.106.124:27017/main', config.formatted_credentials('mongodb', 'pysolr'))
+
+        config = Config(self.mockEnvironmentDeploy, addressing='host')
+
+        self.assertEqual('mongodb.internal:27017/main', config.formatted_credentials('mongodb', 'pymongo'))
+        self.assertEqual('http://mongodb.internal:27017/main', config.formatted_credentials('mongodb', 'pysolr'))
+
+    def test_resolved_addressing_uses_dns_cache(self):
+
+        addresses = {'mongodb.internal': '10.0.0.1'}
+        lookups = []
+
+        def resolve(host):
+            lookups.append(host)
+            return addresses[host]
+
+        config = Config(self.mockEnvironmentDeploy, addressing='resolved', dns_cache=DnsCache(ttl=0, resolve=resolve))
+
+        self.assertEqual('10.0.0.1:27017/main', config.formatted_credentials('mongodb', 'pymongo'))
+        addresses['mongodb.internal'] = '10.0.0.2'
+        self.assertEqual('10.0.0.2:27017/main', config.formatted_credentials('mongodb', 'pymongo'))
+        self.assertEqual(2, len(lookups))
+
+        cache = DnsCache(ttl=60, resolve=resolve)
+        config = Config(self.mockEnvironmentDeploy, addressing='resolved', dns_cache=cache)
+        for _ in range(3):
+            self.assertEqual('10.0.0.2', config.addressed_credentials('mongodb')['host'])
+        self.assertEqual(3, len(lookups))
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+    def test_dns_cache_resolves_hosts_independently(self):
+
+        started = threading.Event()
+        release = threading.Event()
+        lookups = []
+
+        def resolve(host):
+            lookups.append(host)
+            if host == 'slow.internal':
+                started.set()
+                release.wait(5)
+            return '10.0.0.1'
+
+        cache = DnsCache(ttl=60, resolve=resolve)
+        slow = [threading.Thread(target=cache.resolve, args=('slow.internal',)) for _ in range(2)]
+        slow[0].start()
+        started.wait(5)
+        slow[1].start()
+
+        # A slow resolution does not hold up the other host names, nor resolves its own host name twice.
+        fast = threading.Thread(target=cache.resolve, args=('fast.internal',))
+        fast.start()
+        fast.join(1)
+        self.assertFalse(fast.is_alive())
+        release.set()
+        for thread in slow:
+            thread.join()
+        self.assertEqual(['slow.internal', 'fast.internal'], lookups)
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_unknown_addressing_throws(self):
+
+        with self.assertRaises(ValueError):
+            Config(self.mockEnvironmentDeploy, addressing='dns')
+
     @staticmethod
     def encode(value):
 
@@ -0,0 +1,103 @@
+import json
+import base64
+import unittest
+
+from platformshconfig import Config
+from platformshconfig import DecodingException
+from platformshconfig import available_decoders
+from platformshconfig import clear_decode_cache
+from platformshconfig import get_decoder
+
+
+class DecoderTest(unittest.TestCase):
+
+    backends = ['orjson', 'simdjson', 'ujson', 'json']
+
+    value = {'routes': [{'id': 'main', 'port': 8080, 'ratio': 0.5, 'enabled': True, 'parent': None}],
+             'name': 'café'}
+
+    def setUp(self):
+
+        self.encoded = base64.b64encode(json.dumps(self.value).encode('utf-8'))
+        clear_decode_cache()
+        self.addCleanup(clear_decode_cache)
+
+    def decoder(self, name):
+        """Returns a decoder, or skips the current subtest if its backend is not installed."""
+
+        try:
+            return get_decoder(name)
+        except ImportError:
+            self.skipTest('{0} is not installed'.format(name))
+
+    def test_decodes_str_and_bytes(self):
+
+        for name in self.backends:
+            with self.subTest(decoder=name):
+                decoder = self.decoder(name)
+                self.assertEqual(self.value, decoder.decode(self.encoded))
+                self.assertEqual(self.value, decoder.decode(self.encoded.decode('ascii')))
+
+    def test_invalid_json(self):
+
+        for name in self.backends:
+            with self.subTest(decoder=name):
+                decoder = self.decoder(name)
+                with self.assertRaises(DecodingException):
+                    decoder.decode(base64.b64encode(b'{"routes": '))
+
+    def test_invalid_base64(self):
+
+        for name in self.backends:
+            with self.subTest(decoder=name):
+                decoder = self.decoder(name)
+                with self.assertRaises(DecodingException):
+                    decoder.decode('e30=é')
+                with self.assertRaises(DecodingException):
+                    decoder.decode('e')
+
+    def test_invalid_utf8(self):
+
+        for name in self.backends:
+            with self.subTest(decoder=name):
+                decoder = self.decoder(name)
+                with self.assertRaises(DecodingException):
+                    decoder.decode(base64.b64encode(b'"\xff"'))
+
+    def test_decoding_exception_is_a_value_error(self):
+
+        with self.assertRaises(ValueError):
+            Config.decode('e')
+
+    def test_default_decoder_is_the_preferred_installed_one(self):
+
+        self.assertEqual(available_decoders()[0], get_decoder().name)
+        self.assertIn('json', available_decoders())
+
+    def test_unknown_decoder(self):
+
+        with self.assertRaises(ValueError):
+            get_decoder('yaml')
+        with self.assertRaises(ValueError):
+            Config({}, decoder='yaml')
+
+    def test_config_decoder(self):
+
+        environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_VARIABLES': self.encoded,
+        }
+        for name in available_decoders():
+            clear_decode_cache()
+            config = Config(environment, decoder=name)
+            self.assertEqual('café', config.variable('name'))
+
+    def test_config_raises_on_invalid_definition(self):
+
+        config = Config({
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_VARIABLES': base64.b64encode(b'{'),
+        }, decoder='json')
+
+        with self.assertRaises(DecodingException):
+            config.variables()
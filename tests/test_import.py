@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+import subprocess
+
+import platformshconfig
+
+
+def run_python(*args):
+    """Runs a Python process with the package importable and bytecode caching enabled, and returns its stderr."""
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run([sys.executable] + list(args), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    return (result.stdout, result.stderr)
+
+
+def import_time(statement):
+    """Returns the number of microseconds spent importing the package's modules while running a statement.
+
+    The time is read from the output of python -X importtime, summing the cumulative time of the top-level imports
+    of the package and its submodules.
+
+    """
+
+    (_, stderr) = run_python('-X', 'importtime', '-c', statement)
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        (_, cumulative, name) = line.split('|')
+        if name.startswith(' platformshconfig'):
+            total += int(cumulative)
+    return total
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'Module __getattr__ and -X importtime require Python 3.7.')
+class ImportTest(unittest.TestCase):
+
+    # The maximum number of microseconds importing the package and the Config class may take. It is about ten times
+    # the current cost, which leaves room for slow machines but not for an eagerly imported json or asyncio.
+    budget = 5000
+
+    statement = 'import platformshconfig; platformshconfig.Config'
+
+    def test_import_time_budget(self):
+
+        # Warm up the bytecode cache, then keep the best of a few runs to smooth out noise.
+        import_time(self.statement)
+        elapsed = min(import_time(self.statement) for _ in range(3))
+
+        self.assertLess(elapsed, self.budget,
+                        'Importing platformshconfig took {0}us, over the budget of {1}us.'.format(
+                            elapsed, self.budget))
+
+    def test_heavy_modules_are_imported_lazily(self):
+
+        (stdout, _) = run_python('-c', 'import sys; before = set(sys.modules); {0}; '
+                                       'print(" ".join(set(sys.modules) - before))'.format(self.statement))
+        imported = set(stdout.split())
+
+        self.assertEqual({'platformshconfig', 'platformshconfig.config'}, imported - {'gc', '_thread'})
+
+    def test_exports(self):
+
+        for (name, module) in platformshconfig._exports.items():
+            submodule = __import__('platformshconfig.' + module, fromlist=[name])
+            self.assertIn(name, submodule.__all__)
+            self.assertIs(getattr(submodule, name), getattr(platformshconfig, name))
+
+        for module in set(platformshconfig._exports.values()):
+            submodule = __import__('platformshconfig.' + module, fromlist=['__all__'])
+            for name in submodule.__all__:
+                self.assertEqual(module, platformshconfig._exports.get(name))
+
+        self.assertIn('AsyncConfig', dir(platformshconfig))
+        with self.assertRaises(AttributeError):
+            platformshconfig.Missing
+
+    def test_moved_formatters_are_importable_from_config(self):
+
+        from platformshconfig import formatters
+        from platformshconfig.config import pymongo_formatter, pysolr_formatter
+
+        self.assertIs(formatters.pymongo_formatter, pymongo_formatter)
+        self.assertIs(formatters.pysolr_formatter, pysolr_formatter)
+        with self.assertRaises(ImportError):
+            from platformshconfig.config import redis_formatter
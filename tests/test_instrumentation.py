@@ -0,0 +1,151 @@
+import json
+import pickle
+import base64
+import unittest
+
+from copy import copy, deepcopy
+
+from platformshconfig import Config
+from platformshconfig import DnsCache
+from platformshconfig import clear_decode_cache
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+
+        clear_decode_cache()
+        self.addCleanup(clear_decode_cache)
+
+        relationships = {
+            'database': [{'scheme': 'mysql', 'host': 'database.internal', 'ip': '10.0.0.1', 'port': 3306,
+                          'path': 'main', 'username': 'user', 'password': ''}],
+        }
+        routes = {
+            'https://www.example.com/': {'type': 'upstream', 'upstream': 'app', 'id': 'main'},
+        }
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PORT': '8080',
+            'PLATFORM_RELATIONSHIPS': base64.b64encode(json.dumps(relationships).encode('utf-8')),
+            'PLATFORM_ROUTES': base64.b64encode(json.dumps(routes).encode('utf-8')),
+            'PLATFORM_VARIABLES': base64.b64encode(json.dumps({'somevar': 'someval'}).encode('utf-8')),
+        }
+
+    def test_stats_are_empty_without_instrumentation(self):
+
+        config = Config(self.environment)
+        config.credentials('database')
+        config.port
+
+        self.assertEqual({
+            'calls': {},
+            'properties': {},
+            'decodes': {},
+            'caches': {
+                'decode': {'hits': 0, 'misses': 0},
+                'formatted_credentials': {'hits': 0, 'misses': 0, 'size': 0},
+            },
+        }, config.stats())
+        self.assertNotIn('credentials', vars(config))
+
+    def test_calls_are_counted(self):
+
+        config = Config(self.environment).instrument()
+        config.credentials('database')
+        config.credentials('database')
+        config.get_route('main')
+        config.variable('somevar')
+        config.port
+        config.get_many('port', 'applicationName')
+        config.formatted_credentials('database', 'pymongo')
+        config.formatted_credentials('database', 'pymongo')
+
+        stats = config.stats()
+
+        self.assertEqual(1, stats['calls']['get_route'])
+        self.assertEqual(1, stats['calls']['variable'])
+        self.assertEqual(2, stats['calls']['formatted_credentials'])
+        self.assertGreaterEqual(stats['calls']['credentials'], 2)
+        self.assertEqual(2, stats['properties']['port'])
+        self.assertEqual(1, stats['properties']['applicationName'])
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1}, stats['caches']['formatted_credentials'])
+
+    def test_decodes_are_measured(self):
+
+        Config(self.environment).routes()
+
+        config = Config(self.environment).instrument()
+        config.routes()
+        config.routes()
+        config.credentials('database')
+
+        stats = config.stats()
+
+        self.assertEqual({'ROUTES', 'RELATIONSHIPS'}, set(stats['decodes']))
+        self.assertEqual(1, stats['decodes']['ROUTES']['hits'])
+        self.assertEqual(0, stats['decodes']['ROUTES']['decodes'])
+        self.assertEqual(1, stats['decodes']['RELATIONSHIPS']['decodes'])
+        self.assertEqual(len(self.environment['PLATFORM_RELATIONSHIPS']), stats['decodes']['RELATIONSHIPS']['bytes'])
+        self.assertGreater(stats['decodes']['RELATIONSHIPS']['seconds'], 0)
+        self.assertEqual({'hits': 1, 'misses': 1}, stats['caches']['decode'])
+
+    def test_observer(self):
+
+        events = []
+        config = Config(self.environment).instrument(lambda metric, value, labels: events.append(
+            (metric, value, labels)))
+        config.variable('somevar')
+        config.port
+
+        self.assertIn(('config_calls', 1, {'method': 'variable'}), events)
+        self.assertIn(('config_calls', 1, {'method': 'property', 'property': 'port'}), events)
+        self.assertIn(('config_cache', 1, {'cache': 'decode', 'blob': 'VARIABLES', 'result': 'miss'}), events)
+        self.assertIn('config_decode_seconds', [event[0] for event in events])
+        self.assertIn(('config_decode_bytes', len(self.environment['PLATFORM_VARIABLES']), {'blob': 'VARIABLES'}),
+                      events)
+
+    def test_reload_is_measured(self):
+
+        config = Config(self.environment).instrument()
+        config.variables()
+        config.reload(dict(self.environment, PLATFORM_VARIABLES=base64.b64encode(b'{"somevar": "other"}')))
+
+        self.assertEqual(2, config.stats()['decodes']['VARIABLES']['decodes'])
+        self.assertEqual('other', config.variable('somevar'))
+
+    def test_uninstrument(self):
+
+        config = Config(self.environment).instrument()
+        config.port
+        config.uninstrument()
+        config.port
+        config.credentials('database')
+
+        self.assertEqual({}, config.stats()['calls'])
+        self.assertNotIn('credentials', vars(config))
+        self.assertEqual('8080', config.port)
+
+    def test_copies_are_not_instrumented(self):
+
+        config = Config(self.environment).instrument()
+        config.credentials('database')
+
+        for clone in (copy(config), deepcopy(config), pickle.loads(pickle.dumps(config))):
+            clone.credentials('database')
+            self.assertEqual('8080', clone.port)
+            self.assertEqual({}, clone.stats()['calls'])
+            self.assertNotIn('credentials', vars(clone))
+
+        self.assertEqual(1, config.stats()['calls']['credentials'])
+        self.assertEqual({}, config.stats()['properties'])
+
+    def test_dns_cache_stats(self):
+
+        config = Config(self.environment, addressing='resolved',
+                        dns_cache=DnsCache(resolve=lambda host: '10.0.0.1'))
+        config.addressed_credentials('database')
+        config.addressed_credentials('database')
+
+        self.assertEqual({'hits': 1, 'misses': 1}, config.stats()['caches']['dns'])
@@ -0,0 +1,176 @@
+import os
+import json
+import base64
+import socket
+import threading
+import unittest
+import multiprocessing
+
+from platformshconfig import Config
+from platformshconfig import Pool
+from platformshconfig import PoolTimeoutException
+
+
+class DummyClient:
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class PoolTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.addCleanup(self.listener.close)
+
+        relationships = {
+            'database': [{
+                'scheme': 'mysql',
+                'host': 'localhost',
+                'ip': '127.0.0.1',
+                'port': self.listener.getsockname()[1],
+                'path': 'main',
+                'username': 'user',
+                'password': '',
+                'rel': 'mysql',
+                'type': 'mysql:10.2',
+            }]
+        }
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_RELATIONSHIPS': base64.b64encode(json.dumps(relationships).encode('utf-8')),
+        }
+
+    @staticmethod
+    def connect(credentials):
+
+        return socket.create_connection((credentials['ip'], credentials['port']), timeout=5)
+
+    def test_pool_is_shared_per_relationship_and_factory(self):
+
+        config = Config(self.environment)
+
+        pool = config.pool('database', DummyClient)
+
+        self.assertIs(pool, config.pool('database', DummyClient))
+        self.assertIsNot(pool, config.pool('database', self.connect))
+
+    def test_concurrent_first_use_creates_one_pool(self):
+
+        config = Config(self.environment)
+        barrier = threading.Barrier(8)
+        pools = []
+
+        def run():
+            barrier.wait()
+            pools.append(config.pool('database', DummyClient))
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(8, len(pools))
+        self.assertEqual(1, len({id(pool) for pool in pools}))
+
+    def test_pool_missing_relationship_throws(self):
+
+        config = Config(self.environment)
+
+        with self.assertRaises(KeyError):
+            config.pool('missing', DummyClient)
+
+    def test_pool_reuses_checked_in_clients(self):
+
+        pool = Config(self.environment).pool('database', self.connect)
+
+        with pool.connection() as first:
+            self.assertEqual(('127.0.0.1', self.listener.getsockname()[1]), first.getpeername())
+        with pool.connection() as second:
+            self.assertIs(first, second)
+
+        self.assertEqual({'size': 1, 'idle': 1, 'in_use': 0}, pool.stats())
+        pool.close()
+        self.assertEqual(-1, first.fileno())
+
+    def test_pool_discards_client_on_error(self):
+
+        pool = Config(self.environment).pool('database', DummyClient)
+
+        with self.assertRaises(ValueError):
+            with pool.connection() as client:
+                raise ValueError('broken')
+
+        self.assertTrue(client.closed)
+        self.assertEqual({'size': 0, 'idle': 0, 'in_use': 0}, pool.stats())
+
+    def test_pool_passes_formatted_credentials(self):
+
+        config = Config(self.environment)
+        config.register_formatter('dsn', lambda credentials: '{ip}:{port}'.format(**credentials))
+
+        client = config.pool('database', DummyClient, formatter='dsn').checkout()
+
+        self.assertEqual('127.0.0.1:{0}'.format(self.listener.getsockname()[1]), client.credentials)
+
+    def test_pool_checkout_times_out_when_exhausted(self):
+
+        pool = Config(self.environment).pool('database', DummyClient, max_size=1)
+
+        client = pool.checkout()
+        with self.assertRaises(PoolTimeoutException):
+            pool.checkout(timeout=0.01)
+
+        threading.Timer(0.05, pool.checkin, [client]).start()
+        self.assertIs(client, pool.checkout(timeout=5))
+
+    def test_pool_prewarm_and_idle_timeout(self):
+
+        pool = Pool(DummyClient, lambda: {}, max_size=5, min_idle=2, idle_timeout=0)
+
+        pool.prewarm()
+        self.assertEqual({'size': 2, 'idle': 2, 'in_use': 0}, pool.stats())
+
+        clients = [pool.checkout() for _ in range(4)]
+        for client in clients:
+            pool.checkin(client)
+        pool.checkout()
+
+        self.assertEqual(2, sum(client.closed for client in clients))
+        self.assertEqual({'size': 2, 'idle': 1, 'in_use': 1}, pool.stats())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'Needs fork().')
+    def test_pool_is_rebuilt_after_fork(self):
+
+        config = Config(self.environment)
+        pool = config.pool('database', DummyClient)
+        parent_client = pool.checkout()
+        pool.checkin(parent_client)
+
+        def child(queue):
+            client = config.pool('database', DummyClient).checkout()
+            queue.put((client is parent_client, pool.stats()['size'], config.pool('database', DummyClient) is pool))
+
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=child, args=(queue,))
+        process.start()
+        result = queue.get(timeout=10)
+        process.join()
+
+        self.assertEqual((False, 0, False), result)
+        self.assertFalse(parent_client.closed)
+        self.assertEqual({'size': 1, 'idle': 1, 'in_use': 0}, pool.stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import time
+import base64
+import socket
+import threading
+import unittest
+
+from unittest import mock
+
+from platformshconfig import Config
+from platformshconfig import BuildTimeVariableAccessException
+from platformshconfig.probe import probe_endpoints
+
+
+class ProbeTest(unittest.TestCase):
+
+    def listener(self, listen=True):
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        if listen:
+            sock.listen(16)
+        self.addCleanup(sock.close)
+        return sock
+
+    def config(self, relationships):
+
+        return Config({
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_RELATIONSHIPS': base64.b64encode(json.dumps(relationships).encode('utf-8')),
+        })
+
+    @staticmethod
+    def endpoint(sock, **extra):
+
+        return dict({'ip': '127.0.0.1', 'host': 'service.internal', 'port': sock.getsockname()[1]}, **extra)
+
+    def test_ready_services_are_reported(self):
+
+        database = self.listener()
+        cache = self.listener()
+        config = self.config({
+            'database': [self.endpoint(database)],
+            'cache': [self.endpoint(cache), self.endpoint(cache)],
+        })
+
+        report = config.wait_for_services(timeout=5)
+
+        self.assertEqual({'database', 'cache'}, set(report))
+        self.assertEqual(2, len(report['cache']))
+        for endpoint in report['database'] + report['cache']:
+            self.assertTrue(endpoint['ready'])
+            self.assertEqual(1, endpoint['attempts'])
+            self.assertIsNotNone(endpoint['latency'])
+
+    def test_late_service_is_retried_with_backoff(self):
+
+        late = self.listener(listen=False)
+        threading.Timer(0.3, late.listen, [16]).start()
+        config = self.config({'late': [self.endpoint(late)]})
+
+        report = config.wait_for_services(timeout=5)
+
+        self.assertTrue(report['late'][0]['ready'])
+        self.assertGreater(report['late'][0]['attempts'], 1)
+        self.assertGreaterEqual(report['late'][0]['elapsed'], 0.3)
+
+    def test_services_are_probed_concurrently(self):
+
+        down = [self.listener(listen=False) for _ in range(4)]
+        config = self.config({'service{}'.format(i): [self.endpoint(sock)] for (i, sock) in enumerate(down)})
+
+        start = time.monotonic()
+        report = config.wait_for_services(timeout=0.5)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.5)
+        for endpoints in report.values():
+            self.assertFalse(endpoints[0]['ready'])
+            self.assertIsInstance(endpoints[0]['error'], OSError)
+
+    def test_selected_relationships_are_probed(self):
+
+        database = self.listener()
+        config = self.config({'database': [self.endpoint(database)], 'other': [self.endpoint(database)]})
+
+        self.assertEqual(['database'], list(config.wait_for_services(timeout=5, relationships=['database'])))
+
+        with self.assertRaises(KeyError):
+            config.wait_for_services(timeout=5, relationships=['missing'])
+
+    def test_wait_for_services_in_build_throws(self):
+
+        config = Config({'PLATFORM_APPLICATION_NAME': 'app'})
+
+        with self.assertRaises(BuildTimeVariableAccessException):
+            config.wait_for_services()
+
+    def test_probe_endpoints_caps_the_threads(self):
+
+        sock = self.listener()
+        threads = []
+
+        def connect(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return create_connection(*args, **kwargs)
+
+        create_connection = socket.create_connection
+        endpoints = [('127.0.0.1', sock.getsockname()[1])] * 10
+        with mock.patch('socket.create_connection', connect):
+            report = probe_endpoints(endpoints, timeout=5, max_workers=4)
+
+        self.assertEqual(10, len(report))
+        self.assertTrue(all(endpoint['ready'] for endpoint in report))
+        self.assertLessEqual(len(set(threads)), 4)
+
+    def test_probe_endpoints_without_endpoints(self):
+
+        self.assertEqual([], probe_endpoints([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
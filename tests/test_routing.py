@@ -0,0 +1,134 @@
+import json
+import base64
+import unittest
+
+from platformshconfig import Config
+from platformshconfig import BuildTimeVariableAccessException
+from platformshconfig.routing import RouteMatcher
+
+
+class RoutingTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.routes = {
+            'https://www.example.com/': {'type': 'upstream', 'upstream': 'app', 'id': 'main',
+                                         'original_url': 'https://www.{default}/'},
+            'https://www.example.com/api/': {'type': 'upstream', 'upstream': 'api', 'id': 'api',
+                                             'original_url': 'https://www.{default}/api/'},
+            'https://www.example.com/api/v2/admin': {'type': 'upstream', 'upstream': 'admin',
+                                                     'original_url': 'https://www.{default}/api/v2/admin'},
+            'http://www.example.com/': {'type': 'redirect', 'to': 'https://www.example.com/',
+                                        'original_url': 'http://www.{default}/'},
+            'https://*.example.com/': {'type': 'upstream', 'upstream': 'tenants',
+                                       'original_url': 'https://*.{default}/'},
+            'https://*.eu.example.com/': {'type': 'upstream', 'upstream': 'eu',
+                                          'original_url': 'https://*.eu.{default}/'},
+            'https://docs.example.com/guide/': {'type': 'upstream', 'upstream': 'docs',
+                                                'original_url': 'https://docs.{all}/guide/'},
+            'https://docs.example.org/guide/': {'type': 'upstream', 'upstream': 'docs',
+                                                'original_url': 'https://docs.{all}/guide/'},
+        }
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_ROUTES': self.encode(self.routes),
+        }
+
+    @staticmethod
+    def encode(value):
+
+        return base64.b64encode(json.dumps(value).encode('utf-8'))
+
+    def upstream(self, config, url):
+
+        route = config.match_route(url)
+        return None if route is None else route.get('upstream', route['type'])
+
+    def test_longest_path_prefix_wins(self):
+
+        config = Config(self.environment)
+
+        self.assertEqual('app', self.upstream(config, 'https://www.example.com/'))
+        self.assertEqual('app', self.upstream(config, 'https://www.example.com/blog/post'))
+        self.assertEqual('app', self.upstream(config, 'https://www.example.com/apis'))
+        self.assertEqual('api', self.upstream(config, 'https://www.example.com/api'))
+        self.assertEqual('api', self.upstream(config, 'https://www.example.com/api/v2/users?page=2'))
+        self.assertEqual('admin', self.upstream(config, 'https://www.example.com/api/v2/admin/users#top'))
+
+    def test_matched_route_has_its_url(self):
+
+        config = Config(self.environment)
+
+        route = config.match_route('https://www.example.com/api/users')
+
+        self.assertEqual('https://www.example.com/api/', route['url'])
+        self.assertEqual('api', route['id'])
+        self.assertNotIn('url', config.routes()['https://www.example.com/api/'])
+
+    def test_scheme_host_and_port(self):
+
+        config = Config(self.environment)
+
+        self.assertEqual('redirect', self.upstream(config, 'http://www.example.com/anything'))
+        self.assertEqual('app', self.upstream(config, 'HTTPS://WWW.Example.COM:443/'))
+        self.assertEqual('redirect', self.upstream(config, 'http://www.example.com:80/'))
+        self.assertIsNone(config.match_route('https://www.example.com:8443/'))
+        self.assertIsNone(config.match_route('ftp://www.example.com/'))
+        self.assertIsNone(config.match_route('https://example.net/'))
+
+    def test_wildcard_hosts(self):
+
+        config = Config(self.environment)
+
+        self.assertEqual('tenants', self.upstream(config, 'https://acme.example.com/'))
+        self.assertEqual('tenants', self.upstream(config, 'https://a.b.example.com/x'))
+        self.assertEqual('eu', self.upstream(config, 'https://acme.eu.example.com/'))
+        self.assertIsNone(config.match_route('https://example.com/'))
+        # The exact host has no route for the root, so the wildcard host serves it.
+        self.assertEqual('tenants', self.upstream(config, 'https://docs.example.com/'))
+        self.assertEqual('docs', self.upstream(config, 'https://docs.example.com/guide/intro'))
+
+    def test_expanded_placeholders(self):
+
+        config = Config(self.environment)
+
+        self.assertEqual('https://docs.example.org/guide/',
+                         config.match_route('https://docs.example.org/guide/')['url'])
+        self.assertIsNone(config.match_route('https://docs.example.org/'))
+
+    def test_results_are_cached_per_host(self):
+
+        matcher = RouteMatcher(self.routes, cache_size=2)
+
+        first = matcher.match('https://www.example.com/a')
+        self.assertIs(first, matcher.match('https://www.example.com/a'))
+        matcher.match('https://www.example.com/b')
+        matcher.match('https://www.example.com/a')
+        matcher.match('https://www.example.com/c')
+
+        self.assertEqual(['/a', '/c'], list(matcher._cache[('https', 'www.example.com')]))
+
+        matcher.match('https://acme.example.com/')
+        matcher.match('https://other.example.com/')
+        self.assertEqual([('https', 'acme.example.com'), ('https', 'other.example.com')], list(matcher._cache))
+        self.assertIs(first, matcher.match('https://www.example.com/a'))
+
+    def test_reload_rebuilds_the_matcher(self):
+
+        config = Config(self.environment)
+        self.assertEqual('api', self.upstream(config, 'https://www.example.com/api/'))
+
+        del self.routes['https://www.example.com/api/']
+        config.reload(dict(self.environment, PLATFORM_ROUTES=self.encode(self.routes)))
+
+        self.assertEqual('app', self.upstream(config, 'https://www.example.com/api/'))
+
+    def test_routes_are_unavailable_at_build_time(self):
+
+        environment = dict(self.environment)
+        del environment['PLATFORM_ENVIRONMENT']
+        config = Config(environment)
+
+        with self.assertRaises(BuildTimeVariableAccessException):
+            config.match_route('https://www.example.com/')
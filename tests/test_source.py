@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import base64
+import shutil
+import tempfile
+import threading
+import unittest
+
+from platformshconfig import Config
+from platformshconfig import EnvironmentSource
+from platformshconfig import FileSource
+from platformshconfig import SnapshotSource
+
+
+class DummyClient:
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class SourceTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.relationships = {
+            'database': [{'scheme': 'mysql', 'host': 'database.internal', 'ip': '10.0.0.1', 'port': 3306,
+                          'username': 'user', 'password': 'one'}],
+            'redis': [{'scheme': 'redis', 'host': 'redis.internal', 'ip': '10.0.0.2', 'port': 6379}],
+        }
+        self.routes = {
+            'https://www.example.com/': {'type': 'upstream', 'upstream': 'app', 'id': 'main'},
+        }
+        self.variables = {'feature': 'off'}
+
+    @staticmethod
+    def encode(value):
+
+        return base64.b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    def environment(self):
+
+        return {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_RELATIONSHIPS': self.encode(self.relationships),
+            'PLATFORM_ROUTES': self.encode(self.routes),
+            'PLATFORM_VARIABLES': self.encode(self.variables),
+        }
+
+    def write_json(self, path, variables):
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as source:
+            json.dump(variables, source)
+        os.replace(tmp_path, path)
+
+    def test_watch_environment_reports_structural_diff(self):
+
+        environment = self.environment()
+        config = Config(environment)
+        routes = config.routes()
+        diffs = []
+        watcher = config.watch(diffs.append, interval=3600)
+        self.addCleanup(watcher.stop)
+
+        self.assertIsNone(watcher.poll())
+
+        self.relationships['database'][0]['password'] = 'two'
+        del self.relationships['redis']
+        self.relationships['cache'] = [{'scheme': 'memcached', 'host': 'cache.internal', 'port': 11211}]
+        self.variables['feature'] = 'on'
+        environment.update(self.environment())
+
+        diff = watcher.poll()
+
+        self.assertEqual({
+            'relationships': {'added': ['cache'], 'removed': ['redis'], 'changed': ['database']},
+            'variables': {'added': [], 'removed': [], 'changed': ['feature']},
+        }, diff)
+        self.assertEqual([diff], diffs)
+        self.assertEqual('two', config.credentials('database')['password'])
+        self.assertFalse(config.has_relationship('redis'))
+        self.assertEqual('on', config.variable('feature'))
+
+        # The routes did not change, so they were not decoded again.
+        self.assertIs(routes, config.routes())
+
+    def test_watch_environment_updates_properties(self):
+
+        environment = dict(self.environment(), PLATFORM_BRANCH='main')
+        config = Config(environment)
+        self.assertEqual('main', config.branch)
+        watcher = config.watch(lambda diff: None, interval=3600)
+        self.addCleanup(watcher.stop)
+
+        environment['PLATFORM_BRANCH'] = 'feature'
+
+        # Until the next poll, the properties read the variables as they were when watching started.
+        self.assertEqual('main', config.branch)
+        self.assertEqual({}, watcher.poll())
+        self.assertEqual('feature', config.branch)
+        self.assertEqual(('feature', 'app'), config.get_many('branch', 'applicationName'))
+
+    def test_watch_without_changes_does_not_call_back(self):
+
+        environment = self.environment()
+        config = Config(environment)
+        diffs = []
+        watcher = config.watch(diffs.append, interval=3600)
+        self.addCleanup(watcher.stop)
+
+        environment['UNRELATED'] = 'value'
+
+        self.assertEqual({}, watcher.poll())
+        self.assertEqual([], diffs)
+
+    def test_reload_closes_pools_of_changed_relationships(self):
+
+        config = Config(self.environment())
+        database = config.pool('database', DummyClient)
+        redis = config.pool('redis', DummyClient)
+        client = database.checkout()
+        database.checkin(client)
+
+        self.relationships['database'][0]['password'] = 'two'
+        config.reload(self.environment())
+
+        self.assertTrue(client.closed)
+        self.assertIsNot(database, config.pool('database', DummyClient))
+        self.assertIs(redis, config.pool('redis', DummyClient))
+        self.assertEqual('two', config.pool('database', DummyClient).checkout().credentials['password'])
+
+    def test_reload_discards_formatted_credentials(self):
+
+        config = Config(self.environment())
+        config.register_formatter('password', lambda credentials: credentials['password'])
+        self.assertEqual('one', config.formatted_credentials('database', 'password'))
+
+        self.relationships['database'][0]['password'] = 'two'
+        config.reload(self.environment())
+
+        self.assertEqual('two', config.formatted_credentials('database', 'password'))
+
+    def test_invalid_reload_leaves_configuration_unchanged(self):
+
+        config = Config(self.environment())
+        environment = dict(self.environment(), PLATFORM_VARIABLES=base64.b64encode(b'{').decode('ascii'))
+
+        with self.assertRaises(ValueError):
+            config.reload(environment)
+        self.assertEqual('off', config.variable('feature'))
+
+    def test_json_file_source(self):
+
+        path = os.path.join(self.directory, 'env.json')
+        variables = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PLATFORM_RELATIONSHIPS': self.relationships,
+            'PLATFORM_VARIABLES': self.encode(self.variables),
+            'PORT': 8080,
+        }
+        self.write_json(path, variables)
+
+        source = FileSource(path)
+        config = Config.from_source(source)
+
+        self.assertTrue(config.in_runtime())
+        self.assertEqual('one', config.credentials('database')['password'])
+        self.assertEqual('off', config.variable('feature'))
+        self.assertEqual('8080', config.port)
+
+        diffs = []
+        watcher = config.watch(diffs.append, source=source, interval=3600)
+        self.addCleanup(watcher.stop)
+        self.assertEqual({}, watcher.poll())
+        self.assertIsNone(watcher.poll())
+
+        variables['PLATFORM_ROUTES'] = self.routes
+        self.write_json(path, variables)
+
+        self.assertEqual({'routes': {'added': ['https://www.example.com/'], 'removed': [], 'changed': []}},
+                         watcher.poll())
+        self.assertEqual('main', config.get_route('main')['id'])
+        self.assertEqual(1, len(diffs))
+
+    def test_dotenv_file_source(self):
+
+        path = os.path.join(self.directory, '.env')
+        with open(path, 'w') as source:
+            source.write('# Platform.sh\n'
+                         'export PLATFORM_APPLICATION_NAME=app\n'
+                         'PLATFORM_ENVIRONMENT="test-environment"\n'
+                         '\n'
+                         "PLATFORM_VARIABLES='{0}'\n"
+                         'PORT=8080 # the port\n'.format(self.encode(self.variables)))
+
+        config = Config.from_source(FileSource(path))
+
+        self.assertTrue(config.in_runtime())
+        self.assertEqual('test-environment', config.environment)
+        self.assertEqual('off', config.variable('feature'))
+        self.assertEqual('8080', config.port)
+
+    def test_invalid_dotenv_file(self):
+
+        path = os.path.join(self.directory, '.env')
+        with open(path, 'w') as source:
+            source.write('PLATFORM_APPLICATION_NAME\n')
+
+        with self.assertRaises(ValueError):
+            Config.from_source(FileSource(path))
+
+    def test_snapshot_source_only_reads_changed_definitions(self):
+
+        path = os.path.join(self.directory, 'config.snapshot')
+        Config(self.environment()).save_snapshot(path)
+
+        source = SnapshotSource(path)
+        config = Config.from_source(source)
+        routes = config.routes()
+        self.assertEqual('one', config.credentials('database')['password'])
+
+        watcher = config.watch(lambda diff: None, source=source, interval=3600)
+        self.addCleanup(watcher.stop)
+        watcher.poll()
+
+        self.relationships['database'][0]['password'] = 'two'
+        Config(self.environment()).save_snapshot(path)
+
+        self.assertEqual({'relationships': {'added': [], 'removed': [], 'changed': ['database']}}, watcher.poll())
+        self.assertEqual('two', config.credentials('database')['password'])
+        self.assertIs(routes, config.routes())
+
+    def test_snapshot_source_with_another_prefix(self):
+
+        path = os.path.join(self.directory, 'config.snapshot')
+        Config(self.environment()).save_snapshot(path)
+
+        with self.assertRaises(ValueError):
+            Config.from_source(SnapshotSource(path), env_prefix='OTHER_')
+
+    def test_background_watcher(self):
+
+        environment = self.environment()
+        config = Config(environment)
+        changed = threading.Event()
+        watcher = config.watch(lambda diff: changed.set(), source=EnvironmentSource(environment), interval=0.01)
+        self.addCleanup(watcher.stop)
+
+        time.sleep(0.05)
+        self.variables['feature'] = 'on'
+        environment['PLATFORM_VARIABLES'] = self.encode(self.variables)
+
+        self.assertTrue(changed.wait(5))
+        self.assertEqual('on', config.variable('feature'))
+
+    def test_background_watcher_survives_invalid_source(self):
+
+        path = os.path.join(self.directory, 'env.json')
+        self.write_json(path, self.environment())
+        source = FileSource(path)
+        config = Config.from_source(source)
+        watcher = config.watch(lambda diff: None, source=source, interval=0.01)
+        self.addCleanup(watcher.stop)
+
+        with open(path, 'w') as invalid:
+            invalid.write('{')
+        deadline = time.monotonic() + 5
+        while watcher.error is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertIsInstance(watcher.error, ValueError)
+        self.assertEqual('one', config.credentials('database')['password'])
+
+        self.variables['feature'] = 'on'
+        self.write_json(path, self.environment())
+        deadline = time.monotonic() + 5
+        while config.variable('feature') != 'on' and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual('on', config.variable('feature'))
+        self.assertIsNone(watcher.error)
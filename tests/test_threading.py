@@ -0,0 +1,145 @@
+import sys
+import json
+import base64
+import threading
+import unittest
+
+from platformshconfig import Config
+from platformshconfig import NoCredentialFormatterFoundException
+from platformshconfig import clear_decode_cache
+
+
+class ThreadingTest(unittest.TestCase):
+
+    # The number of threads hammering a single Config object.
+    threads = 16
+
+    # The number of rounds each thread runs.
+    rounds = 200
+
+    def setUp(self):
+
+        clear_decode_cache()
+        self.addCleanup(clear_decode_cache)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        relationships = {
+            'database': [{'scheme': 'mysql', 'host': 'database.internal', 'ip': '10.0.0.1', 'port': 3306,
+                          'path': 'main', 'username': 'user', 'password': ''}],
+            'mongodb': [{'scheme': 'mongodb', 'host': 'mongodb.internal', 'ip': '10.0.0.2', 'port': 27017,
+                         'path': 'main'}],
+        }
+        routes = {
+            'https://www.example.com/': {'type': 'upstream', 'upstream': 'app', 'id': 'main', 'primary': True},
+        }
+        application = {'name': 'app', 'web': {'locations': {'/': {'root': 'public'}}}}
+        self.environment = {
+            'PLATFORM_APPLICATION_NAME': 'app',
+            'PLATFORM_ENVIRONMENT': 'test-environment',
+            'PORT': '8080',
+            'PLATFORM_RELATIONSHIPS': self.encode(relationships),
+            'PLATFORM_ROUTES': self.encode(routes),
+            'PLATFORM_VARIABLES': self.encode({'somevar': 'someval'}),
+            'PLATFORM_APPLICATION': self.encode(application),
+        }
+
+    @staticmethod
+    def encode(value):
+
+        return base64.b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    def hammer(self, work):
+        """Runs work(thread number, round) in many threads at once, and returns what each call returned."""
+
+        barrier = threading.Barrier(self.threads)
+        results = [[] for _ in range(self.threads)]
+        errors = []
+
+        def run(number):
+            barrier.wait()
+            try:
+                for round_number in range(self.rounds):
+                    results[number].append(work(number, round_number))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run, args=(number,)) for number in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        return [result for thread_results in results for result in thread_results]
+
+    def test_concurrent_first_access(self):
+
+        for _ in range(20):
+            clear_decode_cache()
+            config = Config(self.environment)
+
+            results = self.hammer(lambda number, round_number: (
+                config.credentials('database'),
+                config.get_route('main'),
+                config.typed_credentials('mongodb'),
+                config.routes(),
+                config.application(),
+                config.variable('somevar'),
+                config.application_get('web.locations./.root'),
+                config.formatted_credentials('mongodb', 'pymongo'),
+                config.port,
+            ))
+
+            for position in range(5):
+                self.assertEqual(1, len({id(result[position]) for result in results}))
+            self.assertEqual({('someval', 'public', 'mongodb.internal:27017/main', '8080')},
+                             {result[5:] for result in results})
+
+    def test_registration_during_reads(self):
+
+        config = Config(self.environment)
+        builtin = len(config._credentialFormatters)
+
+        def work(number, round_number):
+            if number % 4 == 0:
+                name = 'custom{0}'.format(round_number % 8)
+                config.register_formatter(name, lambda credentials: credentials['host'])
+                return config.formatted_credentials('database', name)
+            try:
+                formatter = 'custom{0}'.format(round_number % 8)
+                return config.formatted_credentials('database', formatter)
+            except NoCredentialFormatterFoundException:
+                return config.formatted_credentials('mongodb', 'pymongo')
+
+        results = self.hammer(work)
+
+        # Readers may or may not run before the first registration of each formatter.
+        self.assertIn('database.internal', results)
+        self.assertLessEqual(set(results), {'database.internal', 'mongodb.internal:27017/main'})
+        self.assertEqual(8 + builtin, len(config._credentialFormatters))
+
+    def test_formatters_are_per_instance(self):
+
+        first = Config(self.environment)
+        second = Config(self.environment)
+
+        first.register_formatter('custom', lambda credentials: 'first')
+        first.register_formatter('pymongo', lambda credentials: 'replaced')
+
+        self.assertEqual('first', first.formatted_credentials('database', 'custom'))
+        self.assertEqual('replaced', first.formatted_credentials('mongodb', 'pymongo'))
+        with self.assertRaises(NoCredentialFormatterFoundException):
+            second.formatted_credentials('database', 'custom')
+        self.assertEqual('mongodb.internal:27017/main', second.formatted_credentials('mongodb', 'pymongo'))
+        self.assertEqual('mongodb.internal:27017/main',
+                         Config(self.environment).formatted_credentials('mongodb', 'pymongo'))
+
+    def test_no_mutable_class_state(self):
+
+        Config(self.environment).register_formatter('custom', str)
+        self.assertIsNone(Config._credentialFormatters)
+        self.assertIsNone(Config._decodedDefs)
+        self.assertIsNone(Config._formattedCredentials)